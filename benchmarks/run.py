@@ -0,0 +1,205 @@
+"""Kinematics benchmarks with a stored baseline.
+
+    python benchmarks/run.py                 # run and compare with baseline.json
+    python benchmarks/run.py --save          # run and store the results as the new baseline
+    python benchmarks/run.py -k fk -t 0.1    # only workloads containing "fk", fail beyond 10 %
+
+Every workload is timed call by call after a warm-up call; throughput is
+reported in items (poses, problems, plans) per second.  Peak memory is
+measured with tracemalloc in a separate call so it does not slow the timing.
+The run fails if any workload is slower than its baseline by more than the
+threshold.
+
+Raw throughput is only comparable on the machine that recorded it, so each
+timed call is paired with a fixed calibration workload of small and batched
+matrix products, and workloads are compared by their median throughput
+relative to it.  That ratio is what the checked-in baseline.json records; a
+missing baseline is an error unless --save is given.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import numpy as np
+
+import taiwanbear_kinematics as tk
+from ik import effector_positions, floating_base
+from kinematic_chain import FKWorkspace
+from planner import ClimbPlanner
+from routes import load_route
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+ROUTES = [os.path.join(ROOT, "public", f"route{k}.txt") for k in (1, 2, 3)]
+
+
+def _random_poses(n, seed = 0):
+    return tk.HOME + np.random.default_rng(seed).uniform(-0.5, 0.5, (n, tk.DOF))
+
+
+def _hang_problems():
+    # Start stances of the routes as placed by hang_on_wall: (targets, body poses)
+    targets = []
+    poses = []
+    for path in ROUTES:
+        planner = ClimbPlanner(load_route(path))
+        stance = planner.start_stance()
+        targets.append(planner.positions[list(stance)])
+        poses.append(planner.body_pose(stance))
+    return np.array(targets), np.array(poses)
+
+
+def calibration():
+    """Fixed numpy work timed in every run; workloads are compared relative to it."""
+    rng = np.random.default_rng(0)
+    M = rng.normal(size=(512, 4, 4)) / 2
+    B = rng.normal(size=(16384, 4, 4))
+
+    def fn():
+        T = np.eye(4)
+        for m in M:
+            T = T @ m
+        np.matmul(B, B)
+        return T
+    return fn
+
+
+def workloads():
+    """(name, items per call, setup) where setup() returns the function to time."""
+    def fk_single():
+        q = _random_poses(1)[0]
+        return lambda: tk.TAIWANBEAR.forward_kinematics(q)
+
+    def fk_batch():
+        Q = _random_poses(10000)
+        return lambda: tk.forward_kinematics_batch(Q)
+
+    def fk_into():
+        # Effector transforms only, float32, into buffers reused by every call
+        Q = _random_poses(10000)
+        out = np.empty((len(tk.EFFECTORS), len(Q), 3, 4), dtype=np.float32)
+        workspace = FKWorkspace(tk.TAIWANBEAR)
+        return lambda: tk.forward_kinematics_into(Q, out, links=tk.EFFECTORS, workspace=workspace)
+
+    def jacobian():
+        Q = _random_poses(100)
+        return lambda: tk.TAIWANBEAR.jacobian(Q, tk.EFFECTORS)
+
+    def ik_hang():
+        targets, poses = _hang_problems()
+        return lambda: floating_base(tk.TAIWANBEAR, tk.HOME, targets, tk.EFFECTORS, poses)
+
+    def ik_batch():
+        T = tk.forward_kinematics_batch(_random_poses(256, seed=1))
+        targets = effector_positions(tk.TAIWANBEAR, T, tk.EFFECTORS)
+        return lambda: tk.inverse_kinematics(tk.HOME, targets)
+
+    def plan(path):
+        def setup():
+            route = load_route(path)
+            return lambda: ClimbPlanner(route).plan()
+        return setup
+
+    result = [
+        ("fk_single", 1, fk_single),
+        ("fk_batch", 10000, fk_batch),
+        ("fk_into", 10000, fk_into),
+        ("jacobian", 100, jacobian),
+        ("ik_hang", len(ROUTES), ik_hang),
+        ("ik_batch", 256, ik_batch),
+    ]
+    for path in ROUTES:
+        name = os.path.splitext(os.path.basename(path))[0]
+        result.append((f"plan_{name}", 1, plan(path)))
+    return result
+
+
+def measure(fn, items, min_time = 1.0, min_calls = 5, max_calls = 100000, calibrate = None):
+    fn()
+    latencies = []
+    reference = []
+    start = time.perf_counter()
+    while len(latencies) < max_calls and (len(latencies) < min_calls or time.perf_counter() - start < min_time):
+        if calibrate is not None:
+            # Paired with the call that follows, so both see the same machine load
+            t0 = time.perf_counter()
+            calibrate()
+            reference.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    latencies = np.array(latencies)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "ops_per_second": items * len(latencies) / latencies.sum(),
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+        "peak_kib": peak / 1024,
+        "calls": len(latencies),
+    }
+    if calibrate is not None:
+        result["relative"] = float(np.median(items * np.array(reference) / latencies))
+    return result
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Kinematics benchmarks with a stored baseline.")
+    parser.add_argument("-k", "--filter", default="", help="only run workloads whose name contains this")
+    parser.add_argument("-b", "--baseline", default=BASELINE, help="baseline JSON file")
+    parser.add_argument("-t", "--threshold", type=float, default=0.25,
+                        help="allowed throughput loss against the baseline (default 0.25)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to time each workload")
+    parser.add_argument("--save", action="store_true", help="write the results to the baseline file")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    elif not args.save:
+        sys.exit(f"no baseline at {args.baseline}, run with --save to record one")
+
+    calibrate = calibration()
+    calibrate()
+    print("relative = items per calibration call, the median over calls paired with one")
+
+    results = {}
+    failed = []
+    print(f"{'workload':<14}{'ops/s':>12}{'relative':>10}{'p50 ms':>10}{'p99 ms':>10}{'peak KiB':>10}"
+          f"{'baseline':>10}{'change':>9}")
+    for name, items, setup in workloads():
+        if args.filter not in name:
+            continue
+        result = results[name] = measure(setup(), items, args.min_time, calibrate=calibrate)
+        line = (f"{name:<14}{result['ops_per_second']:>12.1f}{result['relative']:>10.4g}{result['p50_ms']:>10.3f}"
+                f"{result['p99_ms']:>10.3f}{result['peak_kib']:>10.0f}")
+        if name in baseline:
+            reference = baseline[name]["relative"]
+            change = result["relative"] / reference - 1
+            line += f"{reference:>10.4g}{change:>+9.1%}"
+            if change < -args.threshold:
+                failed.append(name)
+                line += "  SLOWER"
+        print(line, flush=True)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if failed:
+        sys.exit(f"slower than the baseline by more than {args.threshold:.0%}: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
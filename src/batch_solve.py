@@ -0,0 +1,130 @@
+"""Solve a library of routes on a process pool and stream one JSON line per route.
+
+    python batch_solve.py ../public/route*.txt -o results.jsonl -j 8
+
+Every worker builds the kinematic model and the optional reachability map
+once, then takes routes one at a time; results are written in completion
+order as soon as they arrive.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# One BLAS thread per worker, the pool provides the parallelism
+for _name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_name, "1")
+
+import multiprocessing
+
+import numpy as np
+
+from ik_cache import IKCache
+from planner import ClimbPlanner
+from reachability import ReachabilityMap
+from routes import hold_name, load_route
+
+_reach = None
+_solutions = None
+_options = {}
+
+
+def _init_worker(reach_path, cache_path, options):
+    global _reach, _solutions, _options
+    _reach = ReachabilityMap.load(reach_path) if reach_path else None
+    _solutions = IKCache(cache_path) if cache_path else None
+    _options = options
+
+
+def solve_route(path, reach = None, dx = 0.75, dy = 1.0, plan = True, max_expansions = 2000, **planner_options):
+    """Evaluate one route file and return a JSON-serializable dict.
+
+    The route is hung on at its start stance as hang_on_wall does; the result
+    has the IK residual of each limb there, the holds any limb can reach from
+    that body pose and, with plan, the outcome of a ClimbPlanner search.
+    """
+    t0 = time.perf_counter()
+    result = {"route": path}
+    try:
+        route = load_route(path, dx, dy)
+        planner = ClimbPlanner(route, reach=reach, **planner_options)
+        result["level"] = route.level
+        result["holds"] = len(route.holds)
+
+        start = planner.start_stance()
+        feasible, Q, poses, residuals = planner.solve([start])
+        anchors = planner.anchors + poses[0, :3, 3]
+        d = np.linalg.norm(planner.positions[:, None] - anchors, axis=2)
+        reachable = np.any(d <= planner.radii + planner.body_shift, axis=1)
+        if reach is not None:
+            reachable &= reach.reachable(planner.positions, poses[0]).any(axis=0)
+
+        result["start"] = [hold_name(planner.holds[h]) for h in start]
+        result["start_feasible"] = bool(feasible[0])
+        result["residuals"] = [round(r, 6) if np.isfinite(r) else None for r in residuals[0].tolist()]
+        result["reachable_holds"] = [hold_name(h) for h in planner.holds[reachable]]
+
+        if plan and feasible[0]:
+            found = planner.plan(start, Q[0], max_expansions=max_expansions)
+            result["topped_out"] = found is not None
+            if found is not None:
+                result["moves"] = len(found.stances) - 1
+                result["cost"] = round(found.cost, 6)
+                result["expanded"] = found.expanded
+                result["nodes_per_second"] = round(found.nodes_per_second, 1)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+    result["solve_time"] = round(time.perf_counter() - t0, 6)
+    return result
+
+
+def _solve_in_worker(path):
+    return solve_route(path, _reach, solutions=_solutions, **_options)
+
+
+def solve_routes(paths, workers = None, reach_path = None, cache_path = None, **options):
+    """Yield solve_route results for paths in completion order.
+
+    With cache_path, all workers share an ik_cache.IKCache stored there.
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        _init_worker(reach_path, cache_path, options)
+        yield from map(_solve_in_worker, paths)
+        return
+    with multiprocessing.Pool(workers, _init_worker, (reach_path, cache_path, options)) as pool:
+        yield from pool.imap_unordered(_solve_in_worker, paths)
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("routes", nargs="+", help="route files in the public/route*.txt format")
+    parser.add_argument("-o", "--output", help="JSONL file to write (default stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default all cores)")
+    parser.add_argument("--reach", help="reachability map saved by reachability.py")
+    parser.add_argument("--ik-cache", help="SQLite file of IK solutions shared by the workers")
+    parser.add_argument("--dx", type=float, default=0.75, help="hold spacing across the wall")
+    parser.add_argument("--dy", type=float, default=1.0, help="hold spacing up the wall")
+    parser.add_argument("--no-plan", dest="plan", action="store_false", help="only check the start stance")
+    parser.add_argument("--max-expansions", type=int, default=2000, help="planner node limit per route")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    t0 = time.perf_counter()
+    count = 0
+    try:
+        for result in solve_routes(args.routes, args.workers, args.reach, args.ik_cache, dx=args.dx, dy=args.dy,
+                                   plan=args.plan, max_expansions=args.max_expansions):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - t0
+    print(f"{count} routes in {elapsed:.2f} s ({count / elapsed:.2f} routes/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
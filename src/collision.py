@@ -0,0 +1,139 @@
+import numpy as np
+
+import taiwanbear_kinematics as tk
+
+
+def segment_distances(p0, p1, q0, q1):
+    """Distances between the segments p0-p1 and q0-q1, broadcast over leading axes.
+
+    Closest points follow Ericson, Real-Time Collision Detection, 5.1.9, with
+    every branch replaced by a masked select so whole batches go at once.
+    """
+    d1 = p1 - p0
+    d2 = q1 - q0
+    r = p0 - q0
+    a = np.einsum("...i,...i->...", d1, d1)
+    e = np.einsum("...i,...i->...", d2, d2)
+    b = np.einsum("...i,...i->...", d1, d2)
+    c = np.einsum("...i,...i->...", d1, r)
+    f = np.einsum("...i,...i->...", d2, r)
+    a = np.maximum(a, 1e-12)
+    e = np.maximum(e, 1e-12)
+
+    # Closest points of the infinite lines, s clamped onto the first segment;
+    # parallel segments (denom ~ 0) start from s = 0
+    denom = a * e - b * b
+    parallel = denom <= 1e-12 * a * e
+    s = np.where(parallel, 0.0, np.clip((b * f - c * e) / np.where(parallel, 1.0, denom), 0.0, 1.0))
+    t = (b * s + f) / e
+    # Clamp t onto the second segment and recompute s for the clamped end
+    s = np.where(t < 0.0, np.clip(-c / a, 0.0, 1.0), np.where(t > 1.0, np.clip((b - c) / a, 0.0, 1.0), s))
+    t = np.clip(t, 0.0, 1.0)
+
+    diff = r + d1 * s[..., None] - d2 * t[..., None]
+    return np.sqrt(np.einsum("...i,...i->...", diff, diff))
+
+
+def link_capsules(chain, radius = 0.08, prefix = "Link_"):
+    """Capsules (link, p0, p1, radius) for the links whose name starts with prefix.
+
+    The axis of a capsule runs in link coordinates from the origin of the
+    parent joint to the mean origin of the child joints (or effector).
+    """
+    children = {}
+    for k, p in enumerate(chain.parents):
+        children.setdefault(int(p), []).append(k)
+    capsules = []
+    for k, name in enumerate(chain.names):
+        if not name.startswith(prefix) or chain.parents[k] < 0 or k not in children:
+            continue
+        M = chain.offsets[k]
+        # Parent origin seen from the link: -R^T t
+        p0 = -M[:3, :3].T @ M[:3, 3]
+        p1 = chain.offsets[children[k], :3, 3].mean(axis=0)
+        capsules.append((name, p0, p1, radius))
+    return capsules
+
+
+class CapsuleModel:
+    """Capsule proxies of a kinematic chain for self- and wall-collision tests.
+
+    capsules is a list of (link, p0, p1, radius) with the axis end points in
+    link coordinates.  Pairs of capsules on adjacent links (one link being the
+    closest capsule-carrying ancestor of the other) are never tested, as they
+    share a joint.  Every test takes the (N, links, 4, 4) output of
+    forward_kinematics_batch and checks all N poses at once.
+
+    wall_links are the capsules checked against the wall, by default the body
+    and the upper limbs: a limb on a hold reaches the wall with its foot, and
+    its lower link runs down to the wall from the knee.
+    """
+
+    def __init__(self, chain, capsules, wall_links = None):
+        self.chain = chain
+        self.names = [name for name, _, _, _ in capsules]
+        self.links = np.array([chain.index[name] for name in self.names], dtype=np.intp)
+        self.p0 = np.array([p0 for _, p0, _, _ in capsules], dtype=float)
+        self.p1 = np.array([p1 for _, _, p1, _ in capsules], dtype=float)
+        self.radii = np.array([radius for _, _, _, radius in capsules], dtype=float)
+
+        # Closest capsule-carrying ancestor of every capsule
+        owner = {int(k): i for i, k in enumerate(self.links)}
+        nearest = []
+        for k in self.links:
+            p = chain.parents[k]
+            while p >= 0 and int(p) not in owner:
+                p = chain.parents[p]
+            nearest.append(owner.get(int(p), -1))
+        pairs = [(i, j) for i in range(len(self.links)) for j in range(i + 1, len(self.links))
+                 if nearest[i] != j and nearest[j] != i]
+        self.pairs = np.array(pairs, dtype=np.intp).reshape(-1, 2)
+
+        if wall_links is None:
+            wall_links = [name for name in self.names if "_Foot_" not in name and "_Lower_" not in name]
+        self.wall_capsules = np.array([self.names.index(name) for name in wall_links], dtype=np.intp)
+
+    def segments(self, T):
+        """World axis end points (N, capsules, 2, 3) of the capsules."""
+        T = T[:, self.links]
+        R = T[..., :3, :3]
+        t = T[..., :3, 3]
+        p0 = np.einsum("ncij,cj->nci", R, self.p0) + t
+        p1 = np.einsum("ncij,cj->nci", R, self.p1) + t
+        return np.stack([p0, p1], axis=2)
+
+    def self_distances(self, T, segments = None):
+        """(N, pairs) surface distance of every tested capsule pair, negative if they overlap."""
+        S = self.segments(T) if segments is None else segments
+        i, j = self.pairs.T
+        d = segment_distances(S[:, i, 0], S[:, i, 1], S[:, j, 0], S[:, j, 1])
+        return d - self.radii[i] - self.radii[j]
+
+    def wall_distances(self, T, point = (0.0, 0.0, 0.0), normal = (0.0, 1.0, 0.0), segments = None):
+        """(N, wall capsules) surface distance to the wall plane through point.
+
+        The robot is on the side normal points to; a capsule's distance is
+        that of its lower end point minus its radius.
+        """
+        S = (self.segments(T) if segments is None else segments)[:, self.wall_capsules]
+        normal = np.asarray(normal, dtype=float)
+        normal = normal / np.linalg.norm(normal)
+        height = (S - np.asarray(point, dtype=float)) @ normal
+        return height.min(axis=2) - self.radii[self.wall_capsules]
+
+    def collision_free(self, T, margin = 0.0, wall = True, point = (0.0, 0.0, 0.0), normal = (0.0, 1.0, 0.0)):
+        """(N,) mask of the poses without self collision (and wall collision with wall)."""
+        S = self.segments(T)
+        ok = np.all(self.self_distances(T, S) > margin, axis=1)
+        if wall:
+            ok &= np.all(self.wall_distances(T, point, normal, S) > margin, axis=1)
+        return ok
+
+
+# Limb capsules plus one for the back half of the body, from between the hips
+# to the torso joint
+_hips = tk.LINK_OFFSETS[[tk.LINK_INDEX["RJoint_Back_Upper_XYZ_L"], tk.LINK_INDEX["RJoint_Back_Upper_XYZ_R"]], :3, 3]
+TAIWANBEAR_CAPSULES = link_capsules(tk.TAIWANBEAR) + [
+    ("TaiwanBear", _hips.mean(axis=0), tk.LINK_OFFSETS[tk.LINK_INDEX["RJoint_Torso_XYZ_C"], :3, 3], 0.3),
+]
+TAIWANBEAR = CapsuleModel(tk.TAIWANBEAR, TAIWANBEAR_CAPSULES)
@@ -1,7 +1,14 @@
+import sys
+
 import bpy
+import numpy as np
 from mathutils import Matrix
 import pprint
 
+# Share the joint naming rule with the runtime chain in src/
+sys.path.append(bpy.path.abspath("//../src"))
+from kinematic_chain import joint_type
+
 def get_transformation_matrix( obj_a, obj_b):
     relative_transform_matrix = Matrix.identity
     if ((obj_a is not None) and (obj_b is not None)):
@@ -40,6 +47,39 @@ def get_forward_kinematics(root_obj):
         children.append(fwd)
     return (root_obj, root_par, root_m, children)
 
+def is_kinematic_link(obj):
+    return obj.name.startswith(("RJoint_", "Link_", "Effector_", "Head_"))
+
+def get_kinematic_links(root_obj, root_par = None, links = None):
+    # Flatten the tree into (name, parent, M) entries for kinematic_chain.KinematicChain.
+    # Objects that are not part of the chain are skipped and their children are
+    # attached to the closest kept ancestor.
+    if links is None:
+        links = []
+    name = root_obj.name
+    if root_par is None:
+        links.append((name, None, [list(row) for row in Matrix.Identity(4)]))
+        root_par = root_obj
+    elif is_kinematic_link(root_obj):
+        m = get_transformation_matrix(root_par, root_obj)
+        links.append((name, root_par.name, [list(row) for row in m]))
+        root_par = root_obj
+    for child in root_obj.children:
+        get_kinematic_links(child, root_par, links)
+    return links
+
+def export_kinematic_model(root_obj, path):
+    # Write the chain below root_obj as a binary model file for kinematic_chain.KinematicChain.load:
+    # an uncompressed .npz of link names, parent indices, joint types and offset matrices.
+    links = get_kinematic_links(root_obj)
+    names = [name for name, _, _ in links]
+    index = {name: i for i, name in enumerate(names)}
+    parents = [-1 if parent is None else index[parent] for _, parent, _ in links]
+    joint_types = [joint_type(name) for name in names]
+    np.savez(path, names=np.array(names), parents=np.array(parents, dtype=np.int32),
+             joint_types=np.array(joint_types, dtype=np.int8),
+             offsets=np.array([m for _, _, m in links], dtype=np.float64))
+
 def print_forward_kinematics(fwd, level = 0):
     curr_obj, curr_parent, curr_matrix, curr_children = fwd
     if (curr_matrix is not None):
@@ -77,3 +117,6 @@ print("Relative Scale:", r_scale)
 fwd = get_forward_kinematics(obj_body)
 #pprint.pprint(fwd)
 print_forward_kinematics(fwd)
+
+# Binary model loaded by taiwanbear_kinematics at import, see KinematicChain.load
+export_kinematic_model(bpy.data.objects['TaiwanBear'], bpy.path.abspath("//../src/taiwanbear_chain.npz"))
@@ -0,0 +1,138 @@
+import numpy as np
+
+import instrument
+from kinematic_chain import FKWorkspace
+
+
+def effector_positions(chain, T, effectors):
+    """World positions (N, E, 3) of the effectors in FK output T."""
+    e = [chain.index[name] for name in effectors]
+    return T[:, e][:, :, :3, 3]
+
+
+@instrument.timed("ik")
+def _solve(chain, Q, A, targets, effectors, free_base, tol, max_iterations, damping, min_damping,
+           max_damping, max_step, workspace, base_bounds = None):
+    # Damped least-squares loop shared by the public solvers.  Q and A are
+    # updated in place; with free_base the translation of A is solved for too,
+    # clipped to the (lower, upper) world bounds base_bounds after every step.
+    # Every FK sweep of the loop runs in the same workspace.
+    N = len(Q)
+    if workspace is None:
+        workspace = FKWorkspace(chain, min(4096, max(N, 1)))
+    E = len(effectors)
+    n_vars = chain.dof + (3 if free_base else 0)
+    eye = np.eye(3 * E)
+    base_jacobian = np.tile(np.eye(3), (E, 1))
+    if base_bounds is not None:
+        lower, upper = (np.broadcast_to(np.asarray(bound, dtype=float), (N, 3)) for bound in base_bounds)
+
+    T = chain.forward_kinematics_batch(Q, A, workspace=workspace)
+    err = targets - effector_positions(chain, T, effectors)
+    cost = np.einsum("nij,nij->n", err, err)
+    lam = np.full(N, float(damping))
+    iterations = np.zeros(N, dtype=int)
+
+    active = np.flatnonzero(np.linalg.norm(err, axis=2).max(axis=1) > tol)
+    while active.size > 0:
+        Aa = None if A is None else A[active]
+        J = np.empty((active.size, 3 * E, n_vars))
+        J[:, :, :chain.dof] = chain.jacobian(Q[active], effectors, T=T[active])[:, :, :3].reshape(
+            active.size, 3 * E, chain.dof)
+        if free_base:
+            J[:, :, chain.dof:] = base_jacobian
+        Jt = J.transpose(0, 2, 1)
+        l2 = lam[active, None, None] ** 2
+        dx = (Jt @ np.linalg.solve(J @ Jt + l2 * eye, err[active].reshape(active.size, 3 * E, 1)))[:, :, 0]
+
+        norm = np.linalg.norm(dx, axis=1, keepdims=True)
+        dx *= np.minimum(1.0, max_step / np.maximum(norm, 1e-12))
+
+        Qn = Q[active] + dx[:, :chain.dof]
+        if free_base:
+            Aa = Aa.copy()
+            Aa[:, :3, 3] += dx[:, chain.dof:]
+            if base_bounds is not None:
+                Aa[:, :3, 3] = np.clip(Aa[:, :3, 3], lower[active], upper[active])
+        Tn = chain.forward_kinematics_batch(Qn, Aa, workspace=workspace)
+        en = targets[active] - effector_positions(chain, Tn, effectors)
+        cn = np.einsum("nij,nij->n", en, en)
+
+        better = cn < cost[active]
+        accepted = active[better]
+        Q[accepted] = Qn[better]
+        if free_base:
+            A[accepted] = Aa[better]
+        T[accepted] = Tn[better]
+        err[accepted] = en[better]
+        cost[accepted] = cn[better]
+        lam[active] = np.where(better, np.maximum(lam[active] * 0.5, min_damping), lam[active] * 4.0)
+        iterations[active] += 1
+
+        residual = np.linalg.norm(err[active], axis=2).max(axis=1)
+        active = active[(residual > tol) & (lam[active] <= max_damping) & (iterations[active] < max_iterations)]
+
+    recorder = instrument.active
+    if recorder is not None:
+        residual = np.linalg.norm(err, axis=2).max(axis=1)
+        recorder.count("ik.problems", N)
+        recorder.count("ik.iterations", int(iterations.sum()))
+        recorder.count("ik.converged", int(np.count_nonzero(residual <= tol)))
+        recorder.observe("ik.residual", residual)
+        recorder.observe("ik.iterations", iterations)
+    return err, iterations, T
+
+
+# Solve inverse kinematics with damped least squares
+def damped_least_squares(chain, q, targets, effectors, A = None, tol = 1e-3, max_iterations = 50,
+                         damping = 0.1, min_damping = 1e-4, max_damping = 1e4, max_step = 0.5, workspace = None):
+    """Move several effectors onto position targets at once.
+
+    q is the warm start, an (N, dof) batch of joint vectors (or one vector
+    broadcast to every problem), targets an (N, E, 3) array of world positions
+    for effectors and A the optional (N, 4, 4) or (4, 4) base transform.  All N
+    problems are solved together in one vectorized iteration.
+
+    Every iteration takes a damped least-squares step
+    dq = J^T (J J^T + damping^2 I)^-1 err, limited to max_step radians.  The
+    damping adapts per problem like Levenberg-Marquardt: it shrinks when a
+    step reduces the error and grows (and the step is rejected) otherwise.
+    A problem stops once every effector is within tol of its target, or when
+    its damping exceeds max_damping because no step helps any more.
+    workspace is an optional kinematic_chain.FKWorkspace for the FK sweeps,
+    for callers that solve many batches in a row.
+
+    Returns (Q, err, iterations, T) like Kinematics.inverseKinematics in
+    kinematics.ts: the solved joint vectors, the (N, E, 3) residual vectors,
+    the number of iterations per problem and the link transforms of Q.
+    """
+    targets = np.asarray(targets, dtype=float)
+    N = targets.shape[0]
+    Q = np.array(np.broadcast_to(np.asarray(q, dtype=float), (N, chain.dof)))
+    if A is not None:
+        A = np.broadcast_to(np.asarray(A, dtype=float), (N, 4, 4))
+    err, iterations, T = _solve(chain, Q, A, targets, effectors, False, tol, max_iterations, damping,
+                                min_damping, max_damping, max_step, workspace)
+    return Q, err, iterations, T
+
+
+# Solve inverse kinematics for the joints and the body position
+def floating_base(chain, q, targets, effectors, A = None, tol = 1e-3, max_iterations = 50,
+                  damping = 0.1, min_damping = 1e-4, max_damping = 1e4, max_step = 0.5, workspace = None,
+                  base_bounds = None):
+    """damped_least_squares that may also translate the base.
+
+    A is the warm start for the base transform (identity if None); its
+    rotation is kept and its translation solved for together with the joints,
+    as when the robot shifts its body between holds.  base_bounds is an
+    optional (lower, upper) pair of world translation bounds, each (3,) or
+    (N, 3), the translation is kept within.  Returns
+    (Q, A, err, iterations, T) with the solved (N, 4, 4) base transforms.
+    """
+    targets = np.asarray(targets, dtype=float)
+    N = targets.shape[0]
+    Q = np.array(np.broadcast_to(np.asarray(q, dtype=float), (N, chain.dof)))
+    A = np.array(np.broadcast_to(np.eye(4) if A is None else np.asarray(A, dtype=float), (N, 4, 4)))
+    err, iterations, T = _solve(chain, Q, A, targets, effectors, True, tol, max_iterations, damping,
+                                min_damping, max_damping, max_step, workspace, base_bounds)
+    return Q, A, err, iterations, T
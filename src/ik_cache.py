@@ -0,0 +1,132 @@
+import hashlib
+import sqlite3
+from collections import OrderedDict
+
+import numpy as np
+
+
+class LRUCache:
+    """Least recently used mapping with hit and miss counters."""
+
+    def __init__(self, maxsize = 100000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default = None):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+
+def namespace(*parts):
+    """8-byte digest of the solver setup a solution depends on besides its targets.
+
+    Parts are arrays (hashed by dtype, shape and content) or anything with a
+    stable repr, e.g. the chain offsets, the warm start and the IK options.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(f"{part.dtype}{part.shape}".encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.digest()
+
+
+class IKCache:
+    """IK solutions keyed by the effector targets as seen from the body.
+
+    FK commutes with moving the base, so a solution only depends on where the
+    targets are relative to the body pose it was solved from.  Keys are those
+    body-frame offsets rounded to resolution, so the same hold layout
+    anywhere on the wall lattice, in any route, maps to the same entry; a
+    reused solution may miss its targets by up to half a resolution step per
+    axis.
+
+    Keys start with a namespace (see namespace) so callers with a different
+    chain, warm start or solver settings never share entries.
+
+    A value is (q, shift, residuals): the joint vector, the translation the
+    solver added to the body pose in the body frame of that pose (zero without
+    a floating base) and the per-effector residuals.  Callers should only
+    store solves that converged: the key leaves out the warm start, so a
+    failure from one start would otherwise be replayed for every other.
+    Entries live in an LRU in memory and, with path, in an SQLite file that
+    several worker processes can share.
+    """
+
+    def __init__(self, path = None, maxsize = 100000, resolution = 1e-3):
+        self.memory = LRUCache(maxsize)
+        self.resolution = resolution
+        self.path = path
+        self.disk_hits = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (key BLOB PRIMARY KEY, value BLOB)")
+            self.db.commit()
+
+    def keys(self, targets, A, namespace = b""):
+        """Cache keys of the (N, E, 3) targets seen from the (N, 4, 4) body poses A."""
+        offsets = np.einsum("nei,nij->nej", targets - A[:, None, :3, 3], A[:, :3, :3])
+        q = np.round(offsets / self.resolution).astype("<i4")
+        return [namespace + row.tobytes() for row in q]
+
+    def get_many(self, keys):
+        """Values for keys, None where there is no entry."""
+        values = [self.memory.get(key) for key in keys]
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if self.db is not None and missing:
+            found = {}
+            for i in range(0, len(missing), 500):
+                part = missing[i:i + 500]
+                rows = self.db.execute(f"SELECT key, value FROM solutions WHERE key IN ({','.join('?' * len(part))})",
+                                       part)
+                found.update(rows)
+            for i, key in enumerate(keys):
+                if values[i] is None and key in found:
+                    values[i] = self._decode(found[key])
+                    self.memory.put(key, values[i])
+                    self.disk_hits += 1
+        return values
+
+    def put_many(self, keys, Q, shifts, residuals):
+        for n, key in enumerate(keys):
+            self.memory.put(key, (Q[n].copy(), shifts[n].copy(), residuals[n].copy()))
+        if self.db is not None:
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO solutions VALUES (?, ?)",
+                                    [(key, self._encode(Q[n], shifts[n], residuals[n])) for n, key in enumerate(keys)])
+
+    def _encode(self, q, shift, residuals):
+        header = np.array([len(q), len(residuals)], dtype="<i4").tobytes()
+        return header + np.concatenate([q, shift, residuals]).astype("<f8").tobytes()
+
+    def _decode(self, blob):
+        dof, E = np.frombuffer(blob, dtype="<i4", count=2)
+        data = np.frombuffer(blob, dtype="<f8", offset=8)
+        return data[:dof].copy(), data[dof:dof + 3].copy(), data[dof + 3:dof + 3 + E].copy()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,154 @@
+"""Opt-in counters, timers and traces for the kinematics hot paths.
+
+Instrumented code reads the module global `active` once per call and does
+nothing else while it is None, so the layer costs about a global lookup when
+off.  Turn it on around a piece of work with
+
+    with instrument.recording("trace.json") as rec:
+        planner.plan()
+    print(rec.summary())
+
+or for a whole process, without editing code, by setting
+TAIWANBEAR_TRACE=trace.json: the trace is written and the summary printed to
+stderr at exit.  Traces use the Chrome trace event format (chrome://tracing,
+Perfetto).
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+# The recorder in use, None while instrumentation is off
+active = None
+
+
+class Recorder:
+    """Collects counters, observed values and timed spans."""
+
+    def __init__(self):
+        self.counters = defaultdict(float)
+        self.values = defaultdict(list)
+        self.spans = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter_ns()
+
+    def count(self, name, n = 1):
+        self.counters[name] += n
+
+    def observe(self, name, values):
+        """Record one value or an array of values, e.g. IK residuals."""
+        self.values[name].extend(np.ravel(values).tolist())
+
+    def add_span(self, name, start, end, args = None):
+        with self._lock:
+            self.spans.append((name, start, end, threading.get_ident(), args))
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.perf_counter_ns(), args or None)
+
+    def chrome_trace(self):
+        """Trace events as a dict for json.dump."""
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "pid": pid, "tid": tid, "ts": (start - self._start) / 1e3,
+                   "dur": (end - start) / 1e3, **({"args": args} if args else {})}
+                  for name, start, end, tid, args in self.spans]
+        end = max((e for _, _, e, _, _ in self.spans), default=self._start)
+        events += [{"name": name, "ph": "C", "pid": pid, "tid": 0, "ts": (end - self._start) / 1e3,
+                    "args": {"value": value}} for name, value in sorted(self.counters.items())]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self):
+        """Table of span times, counters and observed values."""
+        lines = []
+        totals = defaultdict(list)
+        for name, start, end, _, _ in self.spans:
+            totals[name].append((end - start) / 1e6)
+        if totals:
+            lines.append(f"{'span':<28}{'calls':>8}{'total ms':>12}{'mean ms':>10}{'max ms':>10}")
+            for name, ms in sorted(totals.items(), key=lambda item: -sum(item[1])):
+                lines.append(f"{name:<28}{len(ms):>8}{sum(ms):>12.2f}{sum(ms) / len(ms):>10.3f}{max(ms):>10.3f}")
+        if self.counters:
+            lines.append(f"{'counter':<28}{'value':>8}")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<28}{value:>8g}")
+        if self.values:
+            lines.append(f"{'value':<28}{'count':>8}{'mean':>12}{'p50':>10}{'max':>10}")
+            for name, values in sorted(self.values.items()):
+                v = np.array(values)
+                lines.append(f"{name:<28}{len(v):>8}{v.mean():>12.4g}{np.median(v):>10.4g}{v.max():>10.4g}")
+        return "\n".join(lines)
+
+
+def enable(recorder = None):
+    """Start recording into recorder (a new Recorder by default) and return it."""
+    global active
+    active = recorder if recorder is not None else Recorder()
+    return active
+
+
+def disable():
+    global active
+    recorder, active = active, None
+    return recorder
+
+
+@contextmanager
+def recording(path = None):
+    """Record within the block; with path, write the Chrome trace there at the end."""
+    previous = active
+    recorder = enable()
+    try:
+        yield recorder
+    finally:
+        if previous is not None:
+            enable(previous)
+        else:
+            disable()
+        if path:
+            recorder.write_trace(path)
+
+
+def timed(name):
+    """Decorator recording every call of a function as a span while recording."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            recorder = active
+            if recorder is None:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                recorder.add_span(name, start, time.perf_counter_ns())
+        return wrapper
+    return decorator
+
+
+def _trace_at_exit(path):
+    recorder = enable()
+
+    def finish():
+        recorder.write_trace(path)
+        print(recorder.summary(), file=sys.stderr)
+    atexit.register(finish)
+
+
+if os.environ.get("TAIWANBEAR_TRACE"):
+    _trace_at_exit(os.environ["TAIWANBEAR_TRACE"])
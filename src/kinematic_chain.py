@@ -0,0 +1,542 @@
+import math
+
+import numpy as np
+
+import instrument
+
+# Joint types, valued by the number of joint angles they consume
+JOINT_FIXED = 0
+JOINT_Z = 1
+JOINT_XYZ = 3
+
+
+def joint_type(name):
+    """Joint type from a Blender object name, following kinematics.ts."""
+    if not name.startswith("RJoint_"):
+        return JOINT_FIXED
+    if "_XYZ_" in name:
+        return JOINT_XYZ
+    if "_Z_" in name:
+        return JOINT_Z
+    return JOINT_FIXED
+
+
+class KinematicChain:
+    """Kinematic tree compiled into contiguous arrays.
+
+    links is a list of (name, parent, M) in topological order, as emitted by
+    fwd_kinematics.get_kinematic_links, where M is the constant 4x4 offset of
+    a link relative to its parent.  Joint links are rotated after their offset
+    by Rz, Ry, Rx (XYZ joints) or Rz (Z joints).
+
+    Joint angles are packed into a vector like Kinematics.calcQConfigIndex in
+    kinematics.ts: joints sorted by name, XYZ joints as three consecutive
+    columns x, y, z.
+
+    A chain can also be stored as a binary model file with save and read back
+    with load, see fwd_kinematics.export_kinematic_model.
+    """
+
+    def __init__(self, links):
+        names = [name for name, _, _ in links]
+        index = {name: i for i, name in enumerate(names)}
+        parents = [-1 if parent is None else index[parent] for _, parent, _ in links]
+        self._compile(names, parents, [m for _, _, m in links])
+
+    @classmethod
+    def from_arrays(cls, names, parents, offsets):
+        """Chain from link names, parent indices (-1 for the root) and an
+        (links, 4, 4) array of offsets, which is used without copying if it
+        is already a contiguous float64 array."""
+        chain = cls.__new__(cls)
+        chain._compile(list(names), parents, offsets)
+        return chain
+
+    # Save the chain as a binary model file
+    def save(self, path):
+        """Write names, parents, joint_types and offsets to an uncompressed .npz."""
+        np.savez(path, names=np.array(self.names), parents=self.parents.astype(np.int32),
+                 joint_types=self.joint_types, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path):
+        """Chain from a model file written by save or export_kinematic_model.
+
+        The members are stored uncompressed, so each array is read straight
+        into its final buffer and adopted by the chain as is.
+        """
+        with np.load(path) as data:
+            chain = cls.from_arrays(data["names"].tolist(), data["parents"], data["offsets"])
+            if "joint_types" in data and not np.array_equal(data["joint_types"], chain.joint_types):
+                raise ValueError(f"{path}: joint types do not match the joint names")
+        return chain
+
+    def _compile(self, names, parents, offsets):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.parents = np.asarray(parents, dtype=np.intp)
+        self.offsets = np.ascontiguousarray(offsets, dtype=float)
+        if self.offsets.shape != (len(self.names), 4, 4) or self.parents.shape != (len(self.names),):
+            raise ValueError("expected one parent and one 4x4 offset per link")
+        self.joint_types = np.array([joint_type(name) for name in self.names], dtype=np.int8)
+
+        if np.any(self.parents >= np.arange(len(self.names))):
+            raise ValueError("links must list every parent before its children")
+
+        self.joint_names = sorted(name for name in self.names if joint_type(name) != JOINT_FIXED)
+        self.q_config_index = {}
+        self.q_config_labels = []
+        for name in self.joint_names:
+            self.q_config_index[name] = len(self.q_config_labels)
+            if joint_type(name) == JOINT_XYZ:
+                self.q_config_labels += [name + "/x", name + "/y", name + "/z"]
+            else:
+                self.q_config_labels.append(name)
+        self.dof = len(self.q_config_labels)
+
+        # First joint-vector column of every link, -1 for fixed links
+        self.q_index = np.array([self.q_config_index.get(name, -1) for name in self.names], dtype=np.intp)
+        self.joint_links = np.flatnonzero(self.joint_types != JOINT_FIXED)
+        self._xyz_links = np.flatnonzero(self.joint_types == JOINT_XYZ)
+        self._xyz_cols = self.q_index[self._xyz_links]
+        self._z_links = np.flatnonzero(self.joint_types == JOINT_Z)
+        self._z_cols = self.q_index[self._z_links]
+        # Batched FK keeps XYZ joints in the first slots and Z joints after them,
+        # so each kind is a plain slice of the work buffers
+        slot_links = np.concatenate([self._xyz_links, self._z_links])
+        self._joint_slot = np.full(len(self.names), -1, dtype=np.intp)
+        self._joint_slot[slot_links] = np.arange(len(slot_links))
+        self._joint_offsets = self.offsets[slot_links][:, None]
+        # Joint-vector columns of the x, y and z angles of every XYZ joint
+        self._xyz_columns = self._xyz_cols + np.arange(3)[:, None]
+
+        # dof_ancestors[k, i] is True if joint-vector column i moves link k
+        self.dof_ancestors = np.zeros((len(self.names), self.dof), dtype=bool)
+        for k in range(len(self.names)):
+            if self.parents[k] >= 0:
+                self.dof_ancestors[k] = self.dof_ancestors[self.parents[k]]
+            if self.joint_types[k] != JOINT_FIXED:
+                i = self.q_index[k]
+                self.dof_ancestors[k, i:i + self.joint_types[k]] = True
+
+        # descendants[k, j] is True if link j is k or lies below it
+        self.descendants = np.eye(len(self.names), dtype=bool)
+        for k in range(len(self.names) - 1, 0, -1):
+            if self.parents[k] >= 0:
+                self.descendants[self.parents[k]] |= self.descendants[k]
+
+        # Work buffers for forward_kinematics
+        self._transforms = np.empty((len(self.names), 4, 4))
+        self._rotation = np.eye(4)
+        self._scratch = np.empty((4, 4))
+
+    def __len__(self):
+        return len(self.names)
+
+    def reach_bound(self, link):
+        """(anchor, radius) such that link always stays within radius of anchor.
+
+        anchor is the first joint on the path from the root to link; its origin
+        does not move relative to the root, and radius adds up the offsets
+        below it.
+        """
+        k = self.index[link] if isinstance(link, str) else link
+        anchor = k
+        radius = 0.0
+        path = []
+        while k >= 0:
+            path.append(k)
+            k = self.parents[k]
+        for k in reversed(path):
+            if self.joint_types[k] != JOINT_FIXED:
+                anchor = k
+                break
+        for k in path:
+            if k == anchor:
+                break
+            radius += float(np.linalg.norm(self.offsets[k, :3, 3]))
+        return anchor, radius
+
+    def config_to_vector(self, q):
+        """Pack a {joint name: angle(s)} dictionary into a joint vector."""
+        vec = np.zeros(self.dof)
+        for name, value in q.items():
+            i = self.q_config_index[name]
+            if joint_type(name) == JOINT_XYZ:
+                vec[i:i + 3] = value
+            else:
+                vec[i] = value
+        return vec
+
+    def vector_to_config(self, vec):
+        """Unpack a joint vector into a {joint name: angle(s)} dictionary."""
+        q = {}
+        for name in self.joint_names:
+            i = self.q_config_index[name]
+            if joint_type(name) == JOINT_XYZ:
+                q[name] = np.array(vec[i:i + 3], dtype=float)
+            else:
+                q[name] = float(vec[i])
+        return q
+
+    def _set_rotation(self, k, q, R):
+        # Rotation of joint link k as one matrix into R: Rz.dot(Ry).dot(Rx) or Rz
+        i = self.q_index[k]
+        if self.joint_types[k] == JOINT_XYZ:
+            cx, sx = math.cos(q[i]), math.sin(q[i])
+            cy, sy = math.cos(q[i + 1]), math.sin(q[i + 1])
+            cz, sz = math.cos(q[i + 2]), math.sin(q[i + 2])
+            R[0, 0] = cz * cy
+            R[0, 1] = cz * sy * sx - sz * cx
+            R[0, 2] = cz * sy * cx + sz * sx
+            R[1, 0] = sz * cy
+            R[1, 1] = sz * sy * sx + cz * cx
+            R[1, 2] = sz * sy * cx - cz * sx
+            R[2, 0] = -sy
+            R[2, 1] = cy * sx
+            R[2, 2] = cy * cx
+        else:
+            cz, sz = math.cos(q[i]), math.sin(q[i])
+            R[0, 0] = cz
+            R[0, 1] = -sz
+            R[0, 2] = 0.0
+            R[1, 0] = sz
+            R[1, 1] = cz
+            R[1, 2] = 0.0
+            R[2, 0] = 0.0
+            R[2, 1] = 0.0
+            R[2, 2] = 1.0
+
+    # Calculate forward kinematics
+    @instrument.timed("fk")
+    def forward_kinematics(self, q, A = None, out = None):
+        """Link transforms for one joint vector q as a (links, 4, 4) array.
+
+        Without out, the result lives in a buffer owned by the chain that is
+        overwritten by the next call.
+        """
+        T = self._transforms if out is None else out
+        q = np.asarray(q, dtype=float)
+        for k in range(len(self.names)):
+            self._update_link(T, k, q, A, self._rotation, self._scratch)
+        return T
+
+    def _update_link(self, T, k, q, A, rotation, scratch):
+        # T[k] from its parent transform (or A for a root) and the joint vector
+        # q, using the 4x4 work buffers rotation (bottom row 0 0 0 1) and scratch
+        p = self.parents[k]
+        if p < 0:
+            if A is None:
+                T[k] = self.offsets[k]
+            else:
+                np.matmul(A, self.offsets[k], out=T[k])
+        else:
+            np.matmul(T[p], self.offsets[k], out=T[k])
+        if self.joint_types[k] != JOINT_FIXED:
+            self._set_rotation(k, q, rotation)
+            np.matmul(T[k], rotation, out=scratch)
+            T[k] = scratch
+
+    def _fk_chunk(self, ws, Q, A, n0, n1, links = None):
+        # Link transforms (links, n, 4, 4) of the poses n0:n1 in the work
+        # buffers of ws, without allocating arrays; with links (ascending
+        # ids), only those links are computed
+        n = n1 - n0
+        ws.resize(n)
+        np.copyto(ws.q, Q[n0:n1].T)
+        np.take(ws.q, self._xyz_columns, axis=0, out=ws.angles, mode="clip")
+        np.cos(ws.angles, out=ws.cos)
+        np.sin(ws.angles, out=ws.sin)
+        cx, cy, cz = ws.cos
+        sx, sy, sz = ws.sin
+        t, u = ws.terms
+        # Rz.dot(Ry).dot(Rx) of the XYZ joints
+        R = ws.rotations_xyz
+        np.multiply(cz, cy, out=R[..., 0, 0])
+        np.multiply(sz, cy, out=R[..., 1, 0])
+        np.negative(sy, out=R[..., 2, 0])
+        np.multiply(cy, sx, out=R[..., 2, 1])
+        np.multiply(cy, cx, out=R[..., 2, 2])
+        np.multiply(sy, sx, out=t)
+        np.multiply(cz, t, out=u)
+        np.multiply(sz, cx, out=R[..., 0, 1])
+        np.subtract(u, R[..., 0, 1], out=R[..., 0, 1])
+        np.multiply(sz, t, out=u)
+        np.multiply(cz, cx, out=R[..., 1, 1])
+        np.add(u, R[..., 1, 1], out=R[..., 1, 1])
+        np.multiply(sy, cx, out=t)
+        np.multiply(cz, t, out=u)
+        np.multiply(sz, sx, out=R[..., 0, 2])
+        np.add(u, R[..., 0, 2], out=R[..., 0, 2])
+        np.multiply(sz, t, out=u)
+        np.multiply(cz, sx, out=R[..., 1, 2])
+        np.subtract(u, R[..., 1, 2], out=R[..., 1, 2])
+        # Rz of the Z joints
+        np.take(ws.q, self._z_cols, axis=0, out=ws.angles_z, mode="clip")
+        R = ws.rotations_z
+        np.cos(ws.angles_z, out=R[..., 0, 0])
+        np.sin(ws.angles_z, out=R[..., 1, 0])
+        np.negative(R[..., 1, 0], out=R[..., 0, 1])
+        np.positive(R[..., 0, 0], out=R[..., 1, 1])
+
+        # Offset times rotation of every joint link
+        local = ws.local
+        np.matmul(self._joint_offsets, ws.rotations, out=local)
+
+        T = ws.transforms
+        for k in range(len(self.names)) if links is None else links:
+            p = self.parents[k]
+            j = self._joint_slot[k]
+            if p < 0:
+                M = self.offsets[k] if j < 0 else local[j]
+                if A is None:
+                    T[k] = M
+                else:
+                    np.matmul(A[n0:n1], M, out=T[k])
+            elif j < 0:
+                np.matmul(T[p].reshape(n * 4, 4), self.offsets[k], out=T[k].reshape(n * 4, 4))
+            else:
+                np.matmul(T[p], local[j], out=T[k])
+        return T
+
+    # Calculate forward kinematics for a batch of configurations
+    @instrument.timed("fk_batch")
+    def forward_kinematics_batch(self, Q, A = None, chunk = 4096, workspace = None):
+        """Vectorized forward_kinematics.
+
+        Q is an (N, dof) array of joint vectors and A an optional (N, 4, 4) or
+        (4, 4) base transform.  Returns an (N, links, 4, 4) array.  The local
+        transforms of all joints are built up front, leaving one matrix
+        product per link, and poses are processed in chunks so the working set
+        stays in cache for large N.  Pass an FKWorkspace to reuse its buffers
+        (and chunk size) across calls.
+        """
+        Q = np.atleast_2d(np.asarray(Q, dtype=float))
+        N = Q.shape[0]
+        recorder = instrument.active
+        if recorder is not None:
+            recorder.count("fk_batch.poses", N)
+        if A is not None:
+            A = np.broadcast_to(np.asarray(A, dtype=float), (N, 4, 4))
+        ws = workspace if workspace is not None else FKWorkspace(self, min(chunk, max(N, 1)))
+
+        result = np.empty((N, len(self.names), 4, 4))
+        for n0 in range(0, N, ws.chunk):
+            n1 = min(N, n0 + ws.chunk)
+            result[n0:n1] = self._fk_chunk(ws, Q, A, n0, n1).transpose(1, 0, 2, 3)
+        return result
+
+    @instrument.timed("fk_into")
+    def forward_kinematics_into(self, Q, out, A = None, links = None, workspace = None):
+        """forward_kinematics_batch into a caller-supplied link-major buffer.
+
+        out is a (len(links), N, 3, 4) or (len(links), N, 4, 4) float32 or
+        float64 array: one contiguous block of N poses per link, in the order
+        of links (link ids or names, all links by default; look ids up in
+        index).  The (3, 4) form drops the constant bottom row.  Only the
+        links and their ancestors are computed.  With a workspace reused
+        across calls, the chunk loop allocates no arrays, so sweeps over
+        millions of poses need little more memory than out itself.
+        """
+        Q = np.atleast_2d(np.asarray(Q, dtype=float))
+        N = Q.shape[0]
+        recorder = instrument.active
+        if recorder is not None:
+            recorder.count("fk_batch.poses", N)
+        if A is not None:
+            A = np.broadcast_to(np.asarray(A, dtype=float), (N, 4, 4))
+        if links is None:
+            links = range(len(self.names))
+            needed = None
+        else:
+            links = [self.index[k] if isinstance(k, str) else k for k in links]
+            needed = np.flatnonzero(self.descendants[:, links].any(axis=1))
+        if out.shape not in ((len(links), N, 3, 4), (len(links), N, 4, 4)):
+            raise ValueError(f"expected out of shape ({len(links)}, {N}, 3 or 4, 4)")
+        rows = out.shape[2]
+        ws = workspace if workspace is not None else FKWorkspace(self, min(4096, max(N, 1)))
+
+        for n0 in range(0, N, ws.chunk):
+            n1 = min(N, n0 + ws.chunk)
+            T = self._fk_chunk(ws, Q, A, n0, n1, needed)
+            for i, k in enumerate(links):
+                np.copyto(out[i, n0:n1], T[k, :, :rows], casting="same_kind")
+        return out
+
+    def joint_axes(self, T, Q):
+        """World rotation axes and origins of every joint-vector column.
+
+        T is the (N, links, 4, 4) output of forward_kinematics_batch for the
+        (N, dof) joint vectors Q.  The intermediate axes of XYZ joints are
+        recovered from the final link frame by undoing Rx and Ry, so no extra
+        FK pass is needed.  Returns two (N, dof, 3) arrays.
+        """
+        Q = np.atleast_2d(np.asarray(Q, dtype=float))
+        N = Q.shape[0]
+        axes = np.empty((N, self.dof, 3))
+        origins = np.empty((N, self.dof, 3))
+
+        R = T[:, self._xyz_links, :3, :3]
+        i = self._xyz_cols
+        cx, sx = np.cos(Q[:, i, None]), np.sin(Q[:, i, None])
+        cy, sy = np.cos(Q[:, i + 1, None]), np.sin(Q[:, i + 1, None])
+        axes[:, i] = R[..., 0]
+        axes[:, i + 1] = cx * R[..., 1] - sx * R[..., 2]
+        axes[:, i + 2] = -sy * R[..., 0] + sx * cy * R[..., 1] + cx * cy * R[..., 2]
+        for d in range(3):
+            origins[:, i + d] = T[:, self._xyz_links][:, :, :3, 3]
+
+        R = T[:, self._z_links]
+        axes[:, self._z_cols] = R[:, :, :3, 2]
+        origins[:, self._z_cols] = R[:, :, :3, 3]
+        return axes, origins
+
+    @instrument.timed("jacobian")
+    def jacobian(self, Q, effectors, A = None, T = None):
+        """Geometric Jacobians of several links for a batch of configurations.
+
+        Returns an (N, len(effectors), 6, dof) array whose rows are the linear
+        velocity of the link origin followed by its angular velocity.  Pass the
+        forward_kinematics_batch result as T to reuse an FK sweep.
+        """
+        Q = np.atleast_2d(np.asarray(Q, dtype=float))
+        if T is None:
+            T = self.forward_kinematics_batch(Q, A)
+        axes, origins = self.joint_axes(T, Q)
+        e = [self.index[name] for name in effectors]
+        mask = self.dof_ancestors[e][None, :, :, None]
+
+        p = T[:, e][:, :, None, :3, 3]
+        J = np.empty((Q.shape[0], len(e), 6, self.dof))
+        J[:, :, :3] = (np.cross(axes[:, None], p - origins[:, None]) * mask).transpose(0, 1, 3, 2)
+        J[:, :, 3:] = (axes[:, None] * mask).transpose(0, 1, 3, 2)
+        return J
+
+
+class FKWorkspace:
+    """Work buffers of batched forward kinematics for chunks of up to chunk poses.
+
+    Made once and passed to forward_kinematics_batch or
+    forward_kinematics_into, it saves reallocating the joint angles and the
+    rotation, local and link transforms of every chunk on each call.  The
+    buffers are flat and viewed as contiguous (..., n) arrays for a chunk of
+    n poses, so the elementwise math never needs NumPy's strided-copy
+    buffers either.  A workspace must not be shared between threads.
+    """
+
+    def __init__(self, chain, chunk = 4096):
+        self.chunk = chunk
+        self.joints = len(chain._xyz_links)
+        self.shapes = {
+            "q": (chain.dof,),
+            "angles": (3, self.joints),
+            "cos": (3, self.joints),
+            "sin": (3, self.joints),
+            "terms": (2, self.joints),
+            "angles_z": (len(chain._z_links),),
+        }
+        self.buffers = {name: np.empty(math.prod(shape) * chunk) for name, shape in self.shapes.items()}
+        self.buffers["rotations"] = np.empty(len(chain.joint_links) * chunk * 16)
+        self.buffers["local"] = np.empty(len(chain.joint_links) * chunk * 16)
+        self.buffers["transforms"] = np.empty(len(chain) * chunk * 16)
+        self.n = None
+
+    def resize(self, n):
+        """Point the views at the first n poses' worth of every buffer."""
+        if n == self.n:
+            return
+        if n > self.chunk:
+            raise ValueError(f"chunk of {n} poses does not fit a workspace for {self.chunk}")
+        for name, shape in self.shapes.items():
+            setattr(self, name, self.buffers[name][:math.prod(shape) * n].reshape(*shape, n))
+        for name in ("rotations", "local", "transforms"):
+            buffer = self.buffers[name]
+            setattr(self, name, buffer[:len(buffer) // self.chunk * n].reshape(-1, n, 4, 4))
+        # Entries outside the rotations are constant: 0, or 1 on the diagonal
+        self.rotations[:] = 0.0
+        self.rotations[:, :, 3, 3] = 1.0
+        self.rotations_xyz = self.rotations[:self.joints]
+        self.rotations_z = self.rotations[self.joints:]
+        self.rotations_z[:, :, 2, 2] = 1.0
+        self.n = n
+
+
+class IncrementalKinematics:
+    """Forward kinematics of one configuration that keeps every link transform.
+
+    Changing joints or the base only marks the links below them as stale, and
+    a query recomputes just the stale links it needs: moving one ankle and
+    reading its effector touches a couple of links instead of the whole tree.
+    """
+
+    def __init__(self, chain, q = None, A = None):
+        self.chain = chain
+        self._q = np.zeros(chain.dof) if q is None else np.array(q, dtype=float)
+        self._A = None if A is None else np.array(A, dtype=float)
+        self._T = np.empty((len(chain), 4, 4))
+        # Work buffers of its own, so it never races forward_kinematics on the chain
+        self._rotation = np.eye(4)
+        self._scratch = np.empty((4, 4))
+        self._stale = np.ones(len(chain), dtype=bool)
+        # Link owning each joint-vector column
+        self._column_links = np.empty(chain.dof, dtype=np.intp)
+        for k in chain.joint_links:
+            i = chain.q_index[k]
+            self._column_links[i:i + chain.joint_types[k]] = k
+        self.updated = 0
+
+    @property
+    def q(self):
+        return self._q.copy()
+
+    @property
+    def A(self):
+        return None if self._A is None else self._A.copy()
+
+    def set_q(self, q):
+        """Set the whole joint vector; only the joints whose angles changed count."""
+        q = np.asarray(q, dtype=float)
+        changed = np.flatnonzero(q != self._q)
+        if changed.size:
+            self._q[changed] = q[changed]
+            self._stale |= self.chain.descendants[self._column_links[changed]].any(axis=0)
+
+    def set_joint(self, name, value):
+        """Set the angle(s) of one joint by name, like config_to_vector."""
+        k = self.chain.index[name]
+        i = self.chain.q_index[k]
+        if i < 0:
+            raise KeyError(f"{name} is not a joint")
+        value = np.broadcast_to(np.asarray(value, dtype=float), (self.chain.joint_types[k],))
+        if np.any(self._q[i:i + len(value)] != value):
+            self._q[i:i + len(value)] = value
+            self._stale |= self.chain.descendants[k]
+
+    def set_base(self, A):
+        self._A = None if A is None else np.array(A, dtype=float)
+        self._stale[:] = True
+
+    def _update(self, links):
+        for k in np.flatnonzero(links):
+            self.chain._update_link(self._T, k, self._q, self._A, self._rotation, self._scratch)
+        self._stale &= ~links
+        self.updated += int(np.count_nonzero(links))
+
+    def transform(self, link):
+        """World transform (4, 4) of one link, recomputing only its stale ancestors.
+
+        Returns a copy; see transforms for the live array.
+        """
+        k = self.chain.index[link] if isinstance(link, str) else link
+        if self._stale[k]:
+            self._update(self._stale & self.chain.descendants[:, k])
+        return self._T[k].copy()
+
+    def transforms(self):
+        """All link transforms like KinematicChain.forward_kinematics.
+
+        The array is owned by this object and kept up to date in place.
+        """
+        if self._stale.any():
+            self._update(self._stale.copy())
+        return self._T
@@ -1,4 +1,4 @@
-import { Object3D, Vector3, Matrix4 } from 'three'
+import { Object3D, Vector3, Matrix4, Euler, Quaternion } from 'three'
 import { calcForwardKinematics } from './taiwanbear_kinematics'
 //import { Vector } from 'three/examples/jsm/Addons.js'
 
@@ -41,8 +41,18 @@ class Kinematics {
   qConfigIndex: { [key: string]: number }
   qConfigIndexReversed: string[]
   qConfigLength: number
+  linkNames: string[]
+  linkIndex: { [name: string]: number }
+  linkObjects: Object3D[]
+  linkParents: number[]
   yup: boolean
 
+  // Work space of forwardKinematicsInto, allocated once
+  private fkWorld: Matrix4[]
+  private fkLocal = new Matrix4()
+  private fkEuler = new Euler()
+  private fkQuaternion = new Quaternion()
+
   constructor(root: Object3D, yup: boolean = false) {
     this.root = root
     this.yup = yup
@@ -52,6 +62,18 @@ class Kinematics {
     this.qConfigIndex = ind
     this.qConfigIndexReversed = indRev
     this.qConfigLength = this.qConfigIndexReversed.length
+
+    // Link order of forwardKinematicsInto, the traversal order of the tree
+    this.linkNames = []
+    this.linkObjects = []
+    this.root.traverse((child) => {
+      this.linkNames.push(child.name)
+      this.linkObjects.push(child)
+    })
+    this.linkIndex = Object.fromEntries(this.linkNames.map((name, i) => [name, i]))
+    this.linkParents = this.linkObjects.map(child =>
+      child === this.root || child.parent === null ? -1 : this.linkObjects.indexOf(child.parent))
+    this.fkWorld = this.linkObjects.map(() => new Matrix4())
     
     {
       const q = this.getCurrentStateConfig()
@@ -135,6 +157,50 @@ class Kinematics {
     return links
   }
 
+  // Link transforms of q as column-major 4x4 blocks of out in linkNames order
+  // (find a link with linkIndex). Composes each joint's local matrix from q and
+  // chains the stored local matrices, so the scene graph is left untouched;
+  // joints missing from q keep their current rotation.
+  forwardKinematicsInto<T extends Float32Array | Float64Array>(q: JointAngles, out: T): T {
+    const objects = this.linkObjects
+    for (let i = 0; i < objects.length; i++) {
+      const child = objects[i]
+      const world = this.fkWorld[i]
+      const qv = q[child.name]
+      let local = child.matrix
+      if (qv !== undefined) {
+        const r = child.rotation
+        if (isDictionary(qv)) {
+          const qc = qv as Rot3Angles
+          this.fkEuler.set(qc.x, qc.y, qc.z, 'XYZ')
+        }
+        else if (!this.yup) {
+          this.fkEuler.set(r.x, r.y, qv as number, 'XYZ')
+        }
+        else {
+          this.fkEuler.set(r.x, qv as number, r.z, 'XYZ')
+        }
+        this.fkQuaternion.setFromEuler(this.fkEuler)
+        local = this.fkLocal.compose(child.position, this.fkQuaternion, child.scale)
+      }
+      const parent = this.linkParents[i]
+      if (parent < 0) {
+        // The root carries whatever places the robot in the scene
+        if (child.parent === null) {
+          world.copy(local)
+        }
+        else {
+          world.multiplyMatrices(child.parent.matrixWorld, local)
+        }
+      }
+      else {
+        world.multiplyMatrices(this.fkWorld[parent], local)
+      }
+      out.set(world.elements, i * 16)
+    }
+    return out
+  }
+
   qConfigStringToIndex(label: string) {
     return this.qConfigIndex[label]
   }
@@ -0,0 +1,64 @@
+import type { Matrix4 } from 'three'
+
+// Client for service.py, which runs FK, IK and planning in a separate Python
+// process so the render loop never blocks on kinematics.
+
+interface KinematicsModel {
+  links: string[]
+  parents: number[]
+  q_config_labels: string[]
+  effectors: string[]
+  home: number[]
+}
+
+interface IKResult {
+  q: Float64Array
+  residuals: Float64Array
+  iterations: number
+}
+
+async function post(url: string, body: BodyInit): Promise<Response> {
+  const response = await fetch(url, { method: 'POST', body })
+  if (!response.ok) {
+    throw new Error(`HTTP error! Status: ${response.status} ${await response.text()}`)
+  }
+  return response
+}
+
+async function fetchModel(baseURL: string): Promise<KinematicsModel> {
+  const response = await fetch(`${baseURL}/model`)
+  if (!response.ok) {
+    throw new Error(`HTTP error! Status: ${response.status}`)
+  }
+  return response.json()
+}
+
+// Link transforms (column-major, 16 floats per link) of every joint vector in qs
+async function forwardKinematics(baseURL: string, qs: number[][], origin: Matrix4): Promise<Float32Array[]> {
+  const rows = qs.map(q => [...q, ...origin.elements])
+  const response = await post(`${baseURL}/fk?base=1`, new Float64Array(rows.flat()))
+  const data = new Float32Array(await response.arrayBuffer())
+  const size = data.length / qs.length
+  return qs.map((_, i) => data.subarray(i * size, (i + 1) * size))
+}
+
+// Solve for every effector target at once, warm started from q
+async function inverseKinematics(
+  baseURL: string,
+  model: KinematicsModel,
+  q: number[],
+  targets: number[][],
+  origin: Matrix4,
+): Promise<IKResult> {
+  const response = await post(`${baseURL}/ik`, new Float64Array([...q, ...targets.flat(), ...origin.elements]))
+  const data = new Float64Array(await response.arrayBuffer())
+  const dof = model.q_config_labels.length
+  const effectors = model.effectors.length
+  return {
+    q: data.subarray(0, dof),
+    residuals: data.subarray(dof, dof + effectors),
+    iterations: data[dof + effectors],
+  }
+}
+
+export { IKResult, KinematicsModel, fetchModel, forwardKinematics, inverseKinematics }
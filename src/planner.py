@@ -0,0 +1,374 @@
+import heapq
+import sys
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+import instrument
+import taiwanbear_kinematics as tk
+from collision import TAIWANBEAR as TAIWANBEAR_COLLISION
+from ik import effector_positions, floating_base
+from ik_cache import LRUCache, namespace
+from kinematic_chain import FKWorkspace
+from routes import HoldIndex, legal_holds
+from stability import TAIWANBEAR_MASSES, center_of_mass, hold_normals, stability_margin
+
+# Positions of the hands within tk.EFFECTORS
+HANDS = [tk.EFFECTORS.index("Effector_Front_L"), tk.EFFECTORS.index("Effector_Front_R")]
+
+
+class Plan(NamedTuple):
+    stances: list
+    configs: list
+    poses: list
+    cost: float
+    expanded: int
+    elapsed: float
+
+    @property
+    def nodes_per_second(self):
+        return self.expanded / self.elapsed if self.elapsed > 0 else float("inf")
+
+
+class ClimbPlanner:
+    """A* search over four-limb stances on a parsed route.
+
+    A stance is a tuple of hold indices, one per tk.EFFECTORS entry, and an
+    edge moves a single limb to another free hold within max_move.  The body
+    pose of a stance is the translation that best fits the HOME effector
+    layout onto its holds.  An edge is feasible if IK, warm started from the
+    source stance, puts every effector within tol of its hold.  Results are
+    kept in an LRU cache keyed by the target stance, so a stance reached by
+    several moves is solved once, and all uncached stances of an expansion
+    are solved as one IK batch.
+
+    Edge cost is the distance the limb travels and the heuristic is the height
+    left between the highest hand and the top row, which a hand has to cover
+    at least once.  The climb is topped out when a hand is on the top row.
+    The heuristic is inflated by weight, trading optimality (the plan costs at
+    most weight times the optimum) for far fewer expansions.
+
+    reach is an optional reachability.ReachabilityMap used to discard moves
+    before running IK on them, and collision a collision.CapsuleModel that
+    rejects IK solutions driving a limb into the body or the wall (None skips
+    the test).  Stances whose stability.stability_margin falls below
+    min_stability (None skips the test) are discarded before IK, using the
+    center of mass of the HOME pose moved to the fitted body pose; the
+    default 0 drops stances no contact forces can hold.
+
+    solutions is an optional ik_cache.IKCache consulted before solving a
+    stance, so stances with the same hold layout relative to the body are only
+    solved once, across plans, routes and, with its on-disk store, processes.
+    Its keys are namespaced by the chain, HOME, the IK options and height;
+    the warm start from the neighbouring stance is not part of the key, so
+    only solves that converged are stored there and failures stay in this
+    planner's own cache.
+    """
+
+    def __init__(self, route, max_move = 2.5, height = 1.2, body_shift = 0.5, weight = 10.0, tol = 1e-2,
+                 reach = None, collision = TAIWANBEAR_COLLISION, min_stability = 0.0, solutions = None,
+                 cache_size = 100000, ik_options = None):
+        self.holds = route.holds
+        self.positions = route.holds["position"]
+        self.index = HoldIndex(route.holds)
+        self.max_move = max_move
+        self.height = height
+        self.body_shift = body_shift
+        self.weight = weight
+        self.tol = tol
+        self.reach = reach
+        self.collision = collision
+        self.min_stability = min_stability
+        self.solutions = solutions
+        self.normals = hold_normals(route.holds)
+        self.cache = LRUCache(cache_size)
+        self.pruned = LRUCache(cache_size)
+        self._neighbors = {}
+        self.workspace = FKWorkspace(tk.TAIWANBEAR, 256)
+        self.ik_options = {"tol": tol / 2, "max_iterations": 8}
+        if ik_options:
+            self.ik_options.update(ik_options)
+        # Everything besides the targets that shapes a solve: IK cache entries
+        # of planners with other settings must not be reused
+        self.namespace = namespace(tk.TAIWANBEAR.offsets, tk.HOME, sorted(self.ik_options.items()), height,
+                                   body_shift)
+        # IK may slide the body freely along the wall but only move it
+        # body_shift closer to or further from it
+        self.base_bounds = ([-np.inf, height - body_shift, -np.inf], [np.inf, height + body_shift, np.inf])
+
+        T = tk.forward_kinematics_batch(tk.HOME)
+        self.home_effectors = effector_positions(tk.TAIWANBEAR, T, tk.EFFECTORS)[0]
+        self.home_com = center_of_mass(T, TAIWANBEAR_MASSES)[0]
+        bounds = [tk.TAIWANBEAR.reach_bound(name) for name in tk.EFFECTORS]
+        self.anchors = T[0, [anchor for anchor, _ in bounds], :3, 3]
+        self.radii = np.array([radius for _, radius in bounds])
+        self.top = self.positions[:, 2].max() if len(self.holds) else 0.0
+
+    def body_positions(self, stances):
+        """Body translation (N, 3) of each of the N stances."""
+        p = self.positions[np.asarray(stances)].mean(axis=-2)
+        p[..., [0, 2]] -= self.home_effectors[:, [0, 2]].mean(axis=0)
+        p[..., 1] += self.height
+        return p
+
+    def body_pose(self, stance):
+        A = np.eye(4)
+        A[:3, 3] = self.body_positions(stance)
+        return A
+
+    @instrument.timed("planner.admissible")
+    def admissible(self, stances):
+        """(N,) mask of the stances that pass the tests run before IK: limb
+        reach from the fitted body pose, stability and the reachability map.
+
+        Results are cached per stance, so plan can test all successors of a
+        batch at once and solve reuses the outcome.
+        """
+        result = np.zeros(len(stances), dtype=bool)
+        todo = []
+        for n, stance in enumerate(stances):
+            ok = self.pruned.get(stance)
+            if ok is None:
+                todo.append(n)
+            else:
+                result[n] = ok
+        if not todo:
+            return result
+        stances_todo = np.array([stances[n] for n in todo])
+        body = self.body_positions(stances_todo)
+        targets = self.positions[stances_todo]
+        # Limbs that cannot stretch that far no matter the joint angles
+        anchors = self.anchors + body[:, None]
+        feasible = np.all(np.linalg.norm(targets - anchors, axis=2) <= self.radii + self.body_shift, axis=1)
+        if self.min_stability is not None:
+            n = np.flatnonzero(feasible)
+            com = body[n] + self.home_com
+            normals = self.normals[stances_todo[n]]
+            feasible[n] = stability_margin(targets[n], normals, com) >= self.min_stability
+        if self.reach is not None:
+            pose = np.eye(4)
+            for n in np.flatnonzero(feasible):
+                pose[:3, 3] = body[n]
+                feasible[n] = np.all(np.diagonal(self.reach.reachable(targets[n], pose)))
+        for n, ok in zip(todo, feasible.tolist()):
+            self.pruned.put(stances[n], ok)
+        result[todo] = feasible
+        return result
+
+    @instrument.timed("planner.solve")
+    def solve(self, stances, q = tk.HOME, shift = None):
+        """Floating-base IK for the stances, warm started from the joint vector(s)
+        q and the fitted body poses, moved by the world translation(s) shift.
+
+        Returns (feasible, Q, poses, residuals) where residuals is the (N, E)
+        distance of each effector to its hold, inf for stances rejected
+        before IK (see admissible).
+        """
+        poses = np.tile(np.eye(4), (len(stances), 1, 1))
+        poses[:, :3, 3] = self.body_positions(stances)
+        targets = self.positions[np.array(stances)]
+        feasible = self.admissible(stances)
+        recorder = instrument.active
+        if recorder is not None:
+            recorder.count("planner.stances", len(stances))
+            recorder.count("planner.pruned", len(stances) - int(np.count_nonzero(feasible)))
+        Q = np.broadcast_to(q, (len(stances), tk.DOF)).copy()
+        residuals = np.full((len(stances), len(tk.EFFECTORS)), np.inf)
+        todo = np.flatnonzero(feasible)
+        if self.solutions is not None and todo.size:
+            keys = self.solutions.keys(targets[todo], poses[todo], self.namespace)
+            hit = np.zeros(todo.size, dtype=bool)
+            for i, value in enumerate(self.solutions.get_many(keys)):
+                if value is not None:
+                    n = todo[i]
+                    Q[n], shift, residuals[n] = value
+                    poses[n, :3, 3] += poses[n, :3, :3] @ shift
+                    hit[i] = True
+            keys = [key for key, h in zip(keys, hit) if not h]
+            if recorder is not None:
+                recorder.count("planner.ik_cache_hits", int(np.count_nonzero(hit)))
+            todo = todo[~hit]
+        if todo.size:
+            start = poses[todo]
+            warm = start.copy()
+            if shift is not None:
+                warm[:, :3, 3] += np.broadcast_to(shift, (len(stances), 3))[todo]
+            Qs, As, err, _, _ = floating_base(tk.TAIWANBEAR, Q[todo], targets[todo], tk.EFFECTORS, warm,
+                                              workspace=self.workspace, base_bounds=self.base_bounds,
+                                              **self.ik_options)
+            Q[todo] = Qs
+            poses[todo] = As
+            residuals[todo] = np.linalg.norm(err, axis=2)
+            if self.solutions is not None:
+                # Body translation added by the solver, in the body frame of the key
+                shifts = np.einsum("nji,nj->ni", start[:, :3, :3], As[:, :3, 3] - start[:, :3, 3])
+                # A failure may only be down to the warm start, which the key leaves out
+                ok = np.flatnonzero(residuals[todo].max(axis=1) <= self.tol)
+                self.solutions.put_many([keys[i] for i in ok], Qs[ok], shifts[ok], residuals[todo][ok])
+
+        solved = np.flatnonzero(feasible)
+        feasible[solved] = residuals[solved].max(axis=1) <= self.tol
+        if self.collision is not None and solved.size:
+            T = tk.forward_kinematics_batch(Q[solved], poses[solved], workspace=self.workspace)
+            feasible[solved] &= self.collision.collision_free(T)
+        return feasible, Q, poses, residuals
+
+    def start_stance(self):
+        """Stance at the bottom of the route like hang_on_wall: each limb on the
+        closest free legal hold to where it hangs in the HOME pose."""
+        A = np.eye(4)
+        A[:3, 3] = [self.positions[:, 0].mean(), self.height,
+                    self.positions[:, 2].min() - self.home_effectors[:, 2].min()]
+        stance = []
+        for effector in self.home_effectors + A[:3, 3]:
+            free = np.setdiff1d(np.arange(len(self.holds)), stance)
+            legal = free[legal_holds(self.holds[free], A[:3, 3])]
+            if legal.size == 0:
+                raise ValueError("not enough holds for a start stance")
+            d2 = ((self.positions[legal] - effector) ** 2).sum(axis=1)
+            stance.append(int(legal[np.argmin(d2)]))
+        return tuple(stance)
+
+    def moves(self, stance):
+        """Legal single-limb moves from stance as (limb, hold, new stance)."""
+        limbs, holds = [], []
+        for limb, hold in enumerate(stance):
+            near = self._neighbors.get(hold)
+            if near is None:
+                near = self._neighbors[hold] = self.index.neighbors(self.positions[hold], self.max_move)
+            limbs.append(np.full(len(near), limb))
+            holds.append(near)
+        # Every limb's candidates at once: one body fit and legality test
+        limbs, holds = np.concatenate(limbs), np.concatenate(holds)
+        free = (holds[:, None] != np.array(stance)).all(axis=1)
+        limbs, holds = limbs[free], holds[free]
+        new = np.repeat(np.array([stance]), len(holds), axis=0)
+        new[np.arange(len(holds)), limbs] = holds
+        legal = legal_holds(self.holds[holds], self.body_positions(new))
+        return [(limb, h, tuple(n)) for limb, h, n in zip(limbs[legal].tolist(), holds[legal].tolist(),
+                                                             new[legal].tolist())]
+
+    def heuristic(self, stance):
+        return max(0.0, self.top - max(self.positions[stance[i], 2] for i in HANDS))
+
+    def is_goal(self, stance):
+        return self.heuristic(stance) <= 0.0
+
+    @instrument.timed("plan")
+    def plan(self, start = None, q = None, max_expansions = 100000, batch = 64):
+        """Search from start (default start_stance) with warm start q (default HOME).
+
+        Edges are checked lazily: successors are queued with their optimistic
+        cost and their move is only solved once popped, together with the next
+        batch - 1 entries of the queue.  Returns a Plan, or None if the top
+        cannot be reached.
+        """
+        t0 = time.perf_counter()
+        hits, misses = self.cache.hits, self.cache.misses
+        if start is None:
+            start = self.start_stance()
+        if q is None:
+            q = tk.HOME
+        feasible, Q, poses, _ = self.solve([start], q)
+        if not feasible[0]:
+            raise ValueError(f"start stance {start} is not reachable")
+
+        configs = {start: (Q[0], poses[0])}
+        g = {start: 0.0}
+        parent = {start: None}
+        heap = [(self.weight * self.heuristic(start), 0, 0.0, start, None, -1, -1)]
+        closed = set()
+        expanded = 0
+        tie = 1
+
+        while heap and expanded < max_expansions:
+            popped = []
+            while heap and len(popped) < batch:
+                entry = heapq.heappop(heap)
+                if entry[3] not in closed:
+                    popped.append(entry)
+
+            # Solve every uncached stance in the batch at once, warm started
+            # from the cheapest move reaching it (popped first)
+            results = [None if prev is None else self.cache.get(stance) for _, _, _, stance, prev, _, _ in popped]
+            missing = {}
+            for i, (_, _, _, stance, prev, _, _) in enumerate(popped):
+                if results[i] is None and prev is not None:
+                    missing.setdefault(stance, i)
+            if missing:
+                prevs = [popped[i][4] for i in missing.values()]
+                qs = np.array([configs[prev][0] for prev in prevs])
+                # The body keeps the offset its parent solve gave it from the fit
+                shifts = np.array([configs[prev][1][:3, 3] for prev in prevs]) - self.body_positions(prevs)
+                feasible, Q, poses, _ = self.solve(list(missing), qs, shifts)
+                solved = {}
+                for n, stance in enumerate(missing):
+                    solved[stance] = (bool(feasible[n]), Q[n], poses[n])
+                    self.cache.put(stance, solved[stance])
+                results = [solved[entry[3]] if r is None and entry[4] is not None else r
+                           for entry, r in zip(popped, results)]
+
+            successors = []
+            for (_, _, cost, stance, prev, _, _), result in zip(popped, results):
+                if stance in closed:
+                    continue
+                if prev is not None:
+                    ok, qn, pose = result
+                    if not ok:
+                        continue
+                    g[stance] = cost
+                    parent[stance] = prev
+                    configs[stance] = (qn, pose)
+                if self.is_goal(stance):
+                    self._record(expanded, hits, misses)
+                    return self._plan(stance, parent, configs, g[stance], expanded, time.perf_counter() - t0)
+                closed.add(stance)
+                expanded += 1
+                successors.extend((stance, limb, h, new) for limb, h, new in self.moves(stance) if new not in closed)
+
+            # Successors failing the tests before IK never enter the queue;
+            # testing them all at once keeps the stability LP batches large
+            admissible = self.admissible([new for _, _, _, new in successors])
+            for (stance, limb, h, new), ok in zip(successors, admissible):
+                if not ok:
+                    continue
+                step = float(np.linalg.norm(self.positions[h] - self.positions[stance[limb]]))
+                heapq.heappush(heap, (g[stance] + step + self.weight * self.heuristic(new), tie,
+                                      g[stance] + step, new, stance, limb, h))
+                tie += 1
+
+        self._record(expanded, hits, misses)
+        return None
+
+    def _record(self, expanded, hits, misses):
+        # Counters of one plan call; hits and misses are the cache counts at its start
+        recorder = instrument.active
+        if recorder is not None:
+            recorder.count("plan.expanded", expanded)
+            recorder.count("plan.cache_hits", self.cache.hits - hits)
+            recorder.count("plan.cache_misses", self.cache.misses - misses)
+
+    def _plan(self, goal, parent, configs, cost, expanded, elapsed):
+        stances = []
+        stance = goal
+        while stance is not None:
+            stances.append(stance)
+            stance = parent[stance]
+        stances.reverse()
+        return Plan(stances, [configs[s][0] for s in stances], [configs[s][1] for s in stances],
+                    cost, expanded, elapsed)
+
+
+if __name__ == "__main__":
+    # python planner.py ../public/route2.txt
+    from routes import hold_name, load_route
+
+    planner = ClimbPlanner(load_route(sys.argv[1]))
+    plan = planner.plan()
+    if plan is None:
+        sys.exit("no plan found")
+    for stance in plan.stances:
+        print(" ".join(hold_name(planner.holds[h]) for h in stance))
+    print(f"{len(plan.stances) - 1} moves, cost {plan.cost:.2f}, {plan.expanded} nodes in {plan.elapsed:.3f} s "
+          f"({plan.nodes_per_second:.0f} nodes/s), cache {planner.cache.hits} hits / {planner.cache.misses} misses")
@@ -0,0 +1,69 @@
+import type { Object3D } from 'three'
+import { Matrix4 } from 'three'
+
+// Frame files written by trajectory.py: world transforms of the robot links
+// for every frame, so playback needs no kinematics.
+interface Trajectory {
+  names: string[]
+  fps: number
+  frames: number
+  data: Float32Array
+}
+
+const HEADER_SIZE = 24
+
+async function loadTrajectory(url: string): Promise<Trajectory> {
+  const response = await fetch(url)
+  if (!response.ok) {
+    throw new Error(`HTTP error! Status: ${response.status}`)
+  }
+  const buffer = await response.arrayBuffer()
+  const view = new DataView(buffer)
+
+  const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 8))
+  if (magic !== 'TBFRAME1') {
+    throw new Error(`${url} is not a frame file`)
+  }
+  const links = view.getUint32(8, true)
+  const frames = view.getUint32(12, true)
+  const fps = view.getFloat32(16, true)
+  const size = view.getUint32(20, true)
+  const names = new TextDecoder()
+    .decode(new Uint8Array(buffer, HEADER_SIZE, size))
+    .replace(/\0+$/, '')
+    .split('\n')
+  const data = new Float32Array(buffer, HEADER_SIZE + size, frames * links * 16)
+
+  return { names, fps, frames, data }
+}
+
+// Pose the objects below root like frame of the trajectory; origin places
+// the trajectory in the scene, e.g. the matrixWorld of the wall.
+function applyFrame(root: Object3D, trajectory: Trajectory, frame: number, origin: Matrix4 = new Matrix4()) {
+  const world = new Matrix4()
+  const parentInverse = new Matrix4()
+  const f = Math.min(Math.max(frame, 0), trajectory.frames - 1)
+
+  trajectory.names.forEach((name, i) => {
+    const obj = root.name === name ? root : root.getObjectByName(name)
+    if (!obj) {
+      return
+    }
+    const offset = (f * trajectory.names.length + i) * 16
+    world.fromArray(trajectory.data, offset).premultiply(origin)
+    if (obj.parent) {
+      obj.parent.updateWorldMatrix(true, false)
+      parentInverse.copy(obj.parent.matrixWorld).invert()
+      world.premultiply(parentInverse)
+    }
+    world.decompose(obj.position, obj.quaternion, obj.scale)
+    obj.updateMatrixWorld(true)
+  })
+}
+
+// Frame to show at time seconds after the start
+function frameAt(trajectory: Trajectory, seconds: number) {
+  return Math.min(Math.floor(seconds * trajectory.fps), trajectory.frames - 1)
+}
+
+export { Trajectory, applyFrame, frameAt, loadTrajectory }
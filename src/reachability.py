@@ -0,0 +1,113 @@
+import math
+import sys
+
+import numpy as np
+
+import taiwanbear_kinematics as tk
+from kinematic_chain import FKWorkspace
+
+
+def _dilate(grid):
+    # Grow occupied voxels by one cell along every axis to close sampling gaps
+    out = grid.copy()
+    for axis in range(1, grid.ndim):
+        lo = [slice(None)] * grid.ndim
+        hi = [slice(None)] * grid.ndim
+        lo[axis] = slice(None, -1)
+        hi[axis] = slice(1, None)
+        out[tuple(lo)] |= grid[tuple(hi)]
+        out[tuple(hi)] |= grid[tuple(lo)]
+    return out
+
+
+class ReachabilityMap:
+    """Voxelized workspace of each effector in the body frame.
+
+    The workspace of a limb is fixed relative to the robot root, so a single
+    map answers queries for any body pose: hold positions are moved into the
+    body frame with the inverse of the pose and looked up in the voxel grids.
+    grids has shape (len(effectors), nx, ny, nz) and voxel (i, j, k) covers the
+    cube starting at origin + (i, j, k) * voxel_size.  The outermost layer of
+    voxels is empty, so points outside the grid can be clamped onto it.
+    """
+
+    def __init__(self, effectors, origin, voxel_size, grids):
+        self.effectors = list(effectors)
+        self.index = {name: i for i, name in enumerate(self.effectors)}
+        self.origin = np.asarray(origin, dtype=float)
+        self.voxel_size = float(voxel_size)
+        self.grids = np.asarray(grids, dtype=bool)
+        self.shape = self.grids.shape[1:]
+        self._flat = self.grids.reshape(len(self.effectors), -1)
+
+    @classmethod
+    def build(cls, chain = tk.TAIWANBEAR, effectors = tk.EFFECTORS, q = tk.HOME, spread = math.pi / 2,
+              samples = 200000, voxel_size = 0.05, seed = 0, batch = 50000):
+        """Sample joint vectors q +- spread and voxelize the effector positions."""
+        rng = np.random.default_rng(seed)
+        e = [chain.index[name] for name in effectors]
+        points = np.empty((samples, len(e), 3))
+        # Only the effector transforms, link-major, in buffers reused by every batch
+        workspace = FKWorkspace(chain)
+        T = np.empty((len(e), batch, 3, 4))
+        for n0 in range(0, samples, batch):
+            n1 = min(samples, n0 + batch)
+            Q = q + rng.uniform(-spread, spread, (n1 - n0, chain.dof))
+            chain.forward_kinematics_into(Q, T[:, :n1 - n0], links=e, workspace=workspace)
+            points[n0:n1] = T[:, :n1 - n0, :, 3].transpose(1, 0, 2)
+
+        # Two voxels of margin: one for the dilation, one for the empty border
+        origin = points.reshape(-1, 3).min(axis=0) - 2 * voxel_size
+        idx = np.floor((points - origin) / voxel_size).astype(np.intp)
+        shape = idx.reshape(-1, 3).max(axis=0) + 3
+        grids = np.zeros((len(e), *shape), dtype=bool)
+        for i in range(len(e)):
+            grids[i, idx[:, i, 0], idx[:, i, 1], idx[:, i, 2]] = True
+        return cls(effectors, origin, voxel_size, _dilate(grids))
+
+    def save(self, path):
+        np.savez_compressed(path, effectors=np.array(self.effectors), origin=self.origin,
+                            voxel_size=self.voxel_size, grids=self.grids)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["effectors"].tolist(), data["origin"], data["voxel_size"], data["grids"])
+
+    def grow(self, distance):
+        """Map of a body that may also shift by up to distance from its pose.
+
+        Every workspace is dilated by distance (rounded to whole voxels), with
+        the grids padded so the outermost layer stays empty.
+        """
+        steps = int(round(distance / self.voxel_size))
+        grids = np.pad(self.grids, [(0, 0)] + [(steps, steps)] * 3)
+        for _ in range(steps):
+            grids = _dilate(grids)
+        return ReachabilityMap(self.effectors, self.origin - steps * self.voxel_size, self.voxel_size, grids)
+
+    def _voxels(self, points, A):
+        # Flat voxel index of each point seen from the rigid body pose A
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if A is not None:
+            A = np.asarray(A, dtype=float)
+            points = (points - A[:3, 3]) @ A[:3, :3]
+        idx = np.floor((points - self.origin) / self.voxel_size).astype(np.intp)
+        return np.ravel_multi_index(idx.T, self.shape, mode="clip")
+
+    def reachable(self, points, A = None):
+        """(len(effectors), H) mask of which effector can reach which of the H points.
+
+        points are world positions, A the rigid body pose (root transform) they
+        are seen from; without A the points are taken to be in the body frame.
+        """
+        return self._flat[:, self._voxels(points, A)]
+
+    def reachable_holds(self, effector, points, A = None):
+        """Indices of the points that effector can reach from body pose A."""
+        return np.flatnonzero(self._flat[self.index[effector], self._voxels(points, A)])
+
+
+if __name__ == "__main__":
+    # python reachability.py taiwanbear_reach.npz
+    ReachabilityMap.build().save(sys.argv[1])
@@ -0,0 +1,300 @@
+"""Procedural routes in the public/route*.txt format, kept only if climbable.
+
+    python route_generator.py out_dir [-n 10000] [--level 5] [--reach taiwanbear_reach.npz] [--plan]
+
+Candidates are generated as whole batches of (N, rows, width) hold grids and
+filtered with the same batched kinematic tests for all of them, so producing
+a large corpus for benchmarks and regression runs takes seconds, not a
+planner run per route.  The reachability map is built from HOME unless one
+is given.  The batched tests are a necessary condition only; with --plan the
+routes passing them must also be solved by ClimbPlanner, which costs seconds
+per route.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+import taiwanbear_kinematics as tk
+from ik import effector_positions
+from planner import HANDS, ClimbPlanner
+from reachability import ReachabilityMap
+from routes import HOLD_TYPES, SIDE_ANY, SIDE_LEFT, SIDE_RIGHT, format_route, parse_route
+
+# Grid cell codes: 0 is an empty cell, the others index the route characters
+CHARS = ".URLCV"
+EMPTY, JUG, RIGHT, LEFT, CRIMP, JUG2 = range(len(CHARS))
+SIDES = (SIDE_ANY, SIDE_LEFT, SIDE_RIGHT)
+_CODE_SIDE = np.array([-1] + [HOLD_TYPES[c][1] for c in CHARS[1:]], dtype=np.int8)
+_LUT = np.frombuffer(CHARS.encode(), dtype=np.uint8)
+
+
+def level_parameters(level):
+    """Generator settings for a route level, 1 (easy) to 10 (hard).
+
+    Harder routes have fewer holds in a narrower band around the line, more
+    side pulls and crimps, and more empty rows to bridge.
+    """
+    t = (np.clip(level, 1, 10) - 1) / 9
+    return {
+        "density": 0.85 - 0.45 * t,
+        "band": 1.8 - 0.6 * t,
+        "side_fraction": 0.1 + 0.4 * t,
+        "crimp_fraction": 0.35 * t,
+        "empty_rows": 0.35 * t,
+    }
+
+
+class RouteGenerator:
+    """Random climbing lines on a rows x width grid with a batched climbability test.
+
+    A candidate is climbable if its top row can be reached from its bottom
+    row in limb moves of at most max_move, and a chain of supported body
+    poses leads from the bottom holds to a pose where a hand reaches the top
+    row.  Body poses
+    lie on a grid of half hold spacings over the wall, at height in front of
+    it like ClimbPlanner poses, and neighboring poses are linked.  A pose is
+    supported if every limb has a legal hold within its reach bound (plus
+    body_shift, as ClimbPlanner prunes stances) and, with reach, inside its
+    reachability.ReachabilityMap workspace grown by body_shift, with at least two distinct holds
+    for the hands, two for the feet and four in all.
+
+    The pose-hold tests only depend on the grid, so they are done once as
+    (cells, poses) matrices and a batch of candidates is tested with one
+    matrix product per hold side plus flood fills over the holds and the
+    pose grid.  This
+    is a necessary condition for ClimbPlanner rather than a plan; solvable
+    runs the planner itself, and generate can use it as a final filter.
+    """
+
+    def __init__(self, level = 5, rows = 10, width = 10, dx = 0.75, dy = 1.0, max_move = 2.5, height = 1.2,
+                 body_shift = 0.5, reach = None, seed = None, **parameters):
+        self.level = level
+        self.rows = rows
+        self.width = width
+        self.dx = dx
+        self.dy = dy
+        self.max_move = max_move
+        self.height = height
+        self.body_shift = body_shift
+        self.parameters = level_parameters(level)
+        self.parameters.update(parameters)
+        self.rng = np.random.default_rng(seed)
+
+        full = format_route(level, ["U" * width] * rows)
+        self.cells = parse_route(full.splitlines(keepends=True), dx, dy).holds["position"]
+        self.moves = (np.linalg.norm(self.cells[:, None] - self.cells, axis=2) <= max_move).astype(np.float32)
+
+        T = tk.forward_kinematics_batch(tk.HOME)
+        home = effector_positions(tk.TAIWANBEAR, T, tk.EFFECTORS)[0].mean(axis=0)
+        x, z = self.cells[:, 0], self.cells[:, 2]
+        self.pose_x = np.arange(x.min(), x.max() + 1e-9, dx / 2) - home[0]
+        self.pose_z = np.arange(z.min(), z.max() + 1e-9, dy / 2) - home[2]
+        # Pose grid index of each cell row's height, for the start region
+        self.row_pose = np.round((z.reshape(rows, width)[:, 0] - z.min()) / (dy / 2)).astype(np.intp)
+        poses = np.zeros((len(self.pose_z), len(self.pose_x), 3))
+        poses[..., 0] = self.pose_x
+        poses[..., 1] = height
+        poses[..., 2] = self.pose_z[:, None]
+        poses = poses.reshape(-1, 3)
+
+        bounds = [tk.TAIWANBEAR.reach_bound(name) for name in tk.EFFECTORS]
+        anchors = T[0, [anchor for anchor, _ in bounds], :3, 3]
+        radii = np.array([radius for _, radius in bounds]) + body_shift
+        d = np.linalg.norm(self.cells[None, None] - (poses[:, None] + anchors)[:, :, None], axis=3)
+        limb = d <= radii[:, None]
+        if reach is not None:
+            reach = reach.grow(body_shift)
+            order = [reach.index[name] for name in tk.EFFECTORS]
+            A = np.eye(4)
+            for p, position in enumerate(poses):
+                A[:3, 3] = position
+                limb[p] &= reach.reachable(self.cells, A)[order]
+
+        # (poses, limbs + 3, cells): each limb, then any limb, any hand, any foot
+        feet = [i for i in range(len(tk.EFFECTORS)) if i not in HANDS]
+        tests = np.concatenate([limb, limb.any(axis=1, keepdims=True), limb[:, HANDS].any(axis=1, keepdims=True),
+                                limb[:, feet].any(axis=1, keepdims=True)], axis=1)
+        legal = {
+            SIDE_ANY: np.ones((len(poses), len(x)), dtype=bool),
+            SIDE_LEFT: x[None] >= poses[:, :1],
+            SIDE_RIGHT: x[None] <= poses[:, :1],
+        }
+        self.tests = {side: (tests & legal[side][:, None]).reshape(-1, len(x)).T.astype(np.float32)
+                      for side in SIDES}
+        self.hand_tests = {side: (limb[:, HANDS].any(axis=1) & legal[side]).T.astype(np.float32) for side in SIDES}
+
+    def candidates(self, n):
+        """(n, rows, width) grids of cell codes along random climbing lines."""
+        rng = self.rng
+        p = self.parameters
+        R, W = self.rows, self.width
+        # Line column per row, a random walk up from the bottom row
+        steps = rng.integers(-1, 2, (n, R))
+        center = np.empty((n, R), dtype=np.intp)
+        center[:, -1] = rng.integers(W // 2 - 1, W // 2 + 1, n)
+        for r in range(R - 2, -1, -1):
+            center[:, r] = np.clip(center[:, r + 1] + steps[:, r], 1, W - 2)
+        offset = np.arange(W) - center[:, :, None]
+
+        chance = p["density"] * np.exp(-0.5 * (offset / p["band"]) ** 2)
+        chance *= rng.random((n, R, 1)) >= p["empty_rows"]
+        occupied = rng.random((n, R, W)) < chance
+
+        kind = rng.random((n, R, W))
+        codes = np.where(kind < p["crimp_fraction"], CRIMP, np.where(kind > 0.95, JUG2, JUG)).astype(np.uint8)
+        side = rng.random((n, R, W)) < p["side_fraction"]
+        codes[side & (offset < 0)] = LEFT
+        codes[side & (offset > 0)] = RIGHT
+        codes[~occupied] = EMPTY
+        # Two rows of jug pairs to start from, like the bottom of the public routes
+        for r in (R - 2, R - 1):
+            cols = center[:, r, None] + [0, 1] - rng.integers(0, 2, (n, 1))
+            np.put_along_axis(codes[:, r], np.clip(cols, 0, W - 1), JUG, axis=1)
+        return codes
+
+    def climbable(self, codes):
+        """(N,) mask of the (N, rows, width) candidate grids that pass the pose test."""
+        N = len(codes)
+        flat = codes.reshape(N, -1)
+        side = _CODE_SIDE[flat]
+        limbs = len(tk.EFFECTORS)
+        counts = sum((side == s).astype(np.float32) @ self.tests[s] for s in SIDES)
+        counts = counts.reshape(N, len(self.pose_z), len(self.pose_x), limbs + 3)
+        supported = (np.all(counts[..., :limbs] > 0, axis=-1) & (counts[..., limbs] >= 4)
+                     & (counts[..., limbs + 1] >= 2) & (counts[..., limbs + 2] >= 2))
+
+        rows = codes.any(axis=2)
+        top = rows.argmax(axis=1)
+        bottom = self.rows - 1 - rows[:, ::-1].argmax(axis=1)
+        # Holds connected to the bottom row by limb moves
+        occupied = flat != EMPTY
+        row = np.arange(self.rows).repeat(self.width)
+        held = occupied & (row == bottom[:, None])
+        while True:
+            grown = occupied & (held.astype(np.float32) @ self.moves > 0)
+            if np.array_equal(grown, held):
+                break
+            held = grown
+        connected = np.any(held & (row == top[:, None]), axis=1)
+
+        on_top = np.arange(self.rows)[None, :, None] == top[:, None, None]
+        top_side = np.where(on_top, codes, EMPTY).reshape(N, -1)
+        top_side = _CODE_SIDE[top_side]
+        goal = sum((top_side == s).astype(np.float32) @ self.hand_tests[s] for s in SIDES)
+        goal = goal.reshape(supported.shape) > 0
+
+        # Flood fill from the supported poses up to a row above the lowest holds
+        start = self.row_pose[bottom] + 2
+        reached = supported & (np.arange(len(self.pose_z))[None, :, None] <= start[:, None, None])
+        while True:
+            grown = reached.copy()
+            grown[:, 1:] |= reached[:, :-1]
+            grown[:, :-1] |= reached[:, 1:]
+            grown[:, :, 1:] |= reached[:, :, :-1]
+            grown[:, :, :-1] |= reached[:, :, 1:]
+            grown &= supported
+            if np.array_equal(grown, reached):
+                break
+            reached = grown
+        return connected & np.any(reached & goal, axis=(1, 2))
+
+    def solvable(self, codes, max_expansions = 2000):
+        """(N,) mask of the (N, rows, width) grids ClimbPlanner finds a plan for.
+
+        The planner uses the generator's max_move, height and body_shift and
+        gives up after max_expansions expanded stances.
+        """
+        result = np.zeros(len(codes), dtype=bool)
+        for n, grid in enumerate(codes):
+            route = parse_route(self.text(grid).splitlines(keepends=True), self.dx, self.dy)
+            planner = ClimbPlanner(route, self.max_move, self.height, self.body_shift)
+            try:
+                result[n] = planner.plan(max_expansions=max_expansions) is not None
+            except ValueError:
+                # No reachable start stance
+                pass
+        return result
+
+    def generate(self, n, batch = 4096, max_empty = 8, max_expansions = None):
+        """Yield (rows, width) code grids of n climbable routes, in batches.
+
+        With max_expansions, a candidate passing climbable is only kept if
+        solvable within that many expansions; candidates are planned one at a
+        time and only until n routes are found.  Raises ValueError once
+        max_empty batches in a row kept no candidate, as the level is
+        then (close to) impossible on this grid.
+        """
+        empty = 0
+        while n > 0:
+            codes = self.candidates(batch)
+            codes = codes[self.climbable(codes)]
+            if max_expansions is None:
+                codes = codes[:n]
+            else:
+                keep = []
+                for grid in codes:
+                    if len(keep) == n:
+                        break
+                    if self.solvable(grid[None], max_expansions)[0]:
+                        keep.append(grid)
+                codes = np.array(keep, dtype=codes.dtype).reshape(-1, self.rows, self.width)
+            if len(codes) == 0:
+                empty += 1
+                if empty >= max_empty:
+                    raise ValueError(f"no climbable level {self.level} route on a {self.rows} x {self.width} grid "
+                                     f"in {max_empty} batches of {batch} candidates")
+                continue
+            empty = 0
+            n -= len(codes)
+            yield codes
+
+    def text(self, codes):
+        """Route file text of one (rows, width) code grid."""
+        return format_route(self.level, [row.tobytes().decode() for row in _LUT[codes]])
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="directory for the route files")
+    parser.add_argument("-n", "--count", type=int, default=1000)
+    parser.add_argument("--level", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--batch", type=int, default=4096, help="candidates per batch")
+    parser.add_argument("--reach", help="reachability map saved by reachability.py (default: built from HOME)")
+    parser.add_argument("--plan", action="store_true", help="only keep routes ClimbPlanner solves (slow)")
+    parser.add_argument("--max-expansions", type=int, default=2000,
+                        help="planner search budget of --plan and --verify")
+    parser.add_argument("--verify", type=int, default=0, metavar="K",
+                        help="run ClimbPlanner on the first K routes and report how many it solves")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    reach = ReachabilityMap.load(args.reach) if args.reach else ReachabilityMap.build()
+    generator = RouteGenerator(args.level, args.rows, args.width, reach=reach, seed=args.seed)
+    os.makedirs(args.output, exist_ok=True)
+    grids = []
+    try:
+        max_expansions = args.max_expansions if args.plan else None
+        for codes in generator.generate(args.count, args.batch, max_expansions=max_expansions):
+            for grid in codes:
+                path = os.path.join(args.output, f"route_{args.level}_{len(grids):06d}.txt")
+                with open(path, "w") as f:
+                    f.write(generator.text(grid))
+                grids.append(grid)
+    except ValueError as e:
+        sys.exit(str(e))
+    elapsed = time.perf_counter() - start
+    print(f"{len(grids)} routes in {elapsed:.2f} s ({len(grids) / elapsed * 60:.0f} routes/min)", file=sys.stderr)
+
+    if args.verify:
+        solved = generator.solvable(np.array(grids[:args.verify]), args.max_expansions)
+        print(f"planner solved {np.count_nonzero(solved)} of {len(solved)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
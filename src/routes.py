@@ -0,0 +1,174 @@
+import math
+from typing import NamedTuple
+
+import numpy as np
+
+# Which side of the body a hold may be used from, see findClosestHold in main.ts
+SIDE_ANY = 0
+SIDE_LEFT = 1
+SIDE_RIGHT = 2
+
+# Route characters as read by setupWall in wall.ts: (model name, side)
+HOLD_TYPES = {
+    "U": ("JugCenter1", SIDE_ANY),
+    "R": ("JugRight1", SIDE_RIGHT),
+    "L": ("JugLeft1", SIDE_LEFT),
+    "C": ("CrimpCenter1", SIDE_ANY),
+    "V": ("JugCenter2", SIDE_ANY),
+}
+
+HOLD_DTYPE = np.dtype([
+    ("type", "U1"),
+    ("row", np.int32),
+    ("col", np.int32),
+    ("position", np.float64, 3),
+    ("side", np.int8),
+])
+
+
+class Route(NamedTuple):
+    level: int
+    holds: np.ndarray
+
+
+def hold_name(hold):
+    """Object name of a hold in the viewer, e.g. JugCenter1_3_4."""
+    return f"{HOLD_TYPES[hold['type']][0]}_{hold['row']}_{hold['col']}"
+
+
+def parse_route(lines, dx = 0.75, dy = 1.0):
+    """Parse a route from an iterable of lines like setupWall in wall.ts.
+
+    The first line is the level, the rest a grid of hold characters where row i
+    and column j sit at ((width - 1 - j - width / 2) * dx, 0, (height - 1 - i - height / 2) * dy).
+    Holds are returned as a structured HOLD_DTYPE array.
+    """
+    level = None
+    width = None
+    height = 0
+    found = []
+    newline = False
+    for i, line in enumerate(lines):
+        newline = line.endswith("\n")
+        line = line.rstrip("\r\n")
+        height += 1
+        if i == 0:
+            level = int(line.strip())
+            continue
+        if i == 1:
+            width = len(line)
+        if len(line) == 0 or line.startswith("#"):
+            continue
+        for j, char in enumerate(line):
+            if char in HOLD_TYPES:
+                found.append((char, i, j))
+
+    if level is None:
+        raise ValueError("empty route")
+    if newline:
+        # text.split('\n') in setupWall yields a final empty line
+        height += 1
+
+    holds = np.zeros(len(found), dtype=HOLD_DTYPE)
+    if found:
+        types, rows, cols = zip(*found)
+        holds["type"] = types
+        holds["row"] = rows
+        holds["col"] = cols
+        holds["side"] = [HOLD_TYPES[t][1] for t in types]
+        holds["position"][:, 0] = (width - 1 - holds["col"] - width / 2) * dx
+        holds["position"][:, 2] = (height - 1 - holds["row"] - height / 2) * dy
+    return Route(level, holds)
+
+
+def format_route(level, rows):
+    """Route text for parse_route from the level and the grid rows (strings)."""
+    return f"{level}\n" + "".join(row + "\n" for row in rows)
+
+
+def load_route(path, dx = 0.75, dy = 1.0):
+    with open(path) as f:
+        return parse_route(f, dx, dy)
+
+
+def load_routes(paths, dx = 0.75, dy = 1.0):
+    """Lazily parse many route files, yielding (path, Route)."""
+    for path in paths:
+        yield path, load_route(path, dx, dy)
+
+
+def legal_holds(holds, coM):
+    """Mask of the holds findClosestHold allows for a body centered at coM.
+
+    Left holds must lie at or beyond the center of mass in x, right holds at
+    or before it, and center holds are always legal.  coM may also be an
+    array of one center of mass per hold.
+    """
+    x = holds["position"][:, 0]
+    side = holds["side"]
+    cx = np.asarray(coM)[..., 0]
+    return (side == SIDE_ANY) | ((side == SIDE_LEFT) & (x >= cx)) | ((side == SIDE_RIGHT) & (x <= cx))
+
+
+class HoldIndex:
+    """Uniform grid over the wall plane (x, z) for neighborhood queries on holds.
+
+    Holds are sorted by cell and each cell stores the range of its holds, so a
+    query only looks at the cells that overlap the search area.
+    """
+
+    def __init__(self, holds, cell_size = 1.0):
+        self.holds = holds
+        self.cell_size = float(cell_size)
+        xz = holds["position"][:, [0, 2]]
+        self.lower = xz.min(axis=0) if len(holds) else np.zeros(2)
+        cells = np.floor((xz - self.lower) / self.cell_size).astype(np.intp)
+        self.shape = tuple(cells.max(axis=0) + 1) if len(holds) else (1, 1)
+
+        key = np.ravel_multi_index(cells.T, self.shape) if len(holds) else np.zeros(0, dtype=np.intp)
+        self.order = np.argsort(key, kind="stable")
+        self.cell_start = np.searchsorted(key[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+        self.positions = holds["position"][self.order]
+
+    def _cell_range(self, lo, hi):
+        # Sorted-hold indices of all cells overlapping the box [lo, hi] in (x, z)
+        c0 = np.maximum(np.floor((lo - self.lower) / self.cell_size).astype(np.intp), 0)
+        c1 = np.minimum(np.floor((hi - self.lower) / self.cell_size).astype(np.intp), np.array(self.shape) - 1)
+        if np.any(c1 < c0):
+            return np.zeros(0, dtype=np.intp)
+        parts = []
+        for cx in range(c0[0], c1[0] + 1):
+            row = cx * self.shape[1]
+            parts.append(np.arange(self.cell_start[row + c0[1]], self.cell_start[row + c1[1] + 1]))
+        return np.concatenate(parts)
+
+    def neighbors(self, point, radius):
+        """Indices into holds of the holds within radius of point."""
+        point = np.asarray(point, dtype=float)
+        candidates = self._cell_range(point[[0, 2]] - radius, point[[0, 2]] + radius)
+        d2 = ((self.positions[candidates] - point) ** 2).sum(axis=1)
+        return self.order[candidates[d2 <= radius * radius]]
+
+    def closest(self, point, coM = None):
+        """Index of the closest hold to point, or -1 if there is none.
+
+        With coM, only holds that are legal for that center of mass are
+        considered, following findClosestHold in main.ts.
+        """
+        point = np.asarray(point, dtype=float)
+        # Beyond this radius the search box covers the whole grid
+        limit = self.cell_size * max(self.shape) + math.dist(point[[0, 2]], self.lower)
+        radius = self.cell_size
+        while True:
+            candidates = self._cell_range(point[[0, 2]] - radius, point[[0, 2]] + radius)
+            if coM is not None:
+                candidates = candidates[legal_holds(self.holds[self.order[candidates]], coM)]
+            if len(candidates) > 0:
+                d2 = ((self.positions[candidates] - point) ** 2).sum(axis=1)
+                best = np.argmin(d2)
+                # Holds outside the searched box are further than radius away
+                if d2[best] <= radius * radius or radius > limit:
+                    return int(self.order[candidates[best]])
+            elif radius > limit:
+                return -1
+            radius *= 2
@@ -0,0 +1,264 @@
+"""Local HTTP service for FK, IK and stance planning, so the viewer does no math.
+
+    python service.py [port]
+
+Endpoints (binary bodies are little-endian, 4x4 matrices column-major like
+Matrix4.elements in three.js):
+
+    GET  /model  JSON: link names, joint-vector labels, effectors and HOME
+    POST /fk     float64 rows of q (dof values), followed by one base
+                 transform (16 values) per row with ?base=1;
+                 returns float32 (rows, links, 16) link transforms
+    POST /ik     float64 rows of q (dof), effector targets (effectors * 3) and
+                 base transform (16); returns float64 rows of solved q (dof),
+                 effector residuals (effectors) and iterations (1)
+    POST /plan   route text as in public/route*.txt, ?dx=&dy=;
+                 returns the ClimbPlanner result as JSON
+
+Concurrent /fk and /ik requests are coalesced: whatever arrives within
+`window` seconds of the first request is solved as one vectorized batch on a
+single math thread, leaving the event loop free to take more requests.
+/plan searches run on a thread of their own, so a long plan does not hold
+up /fk and /ik batches.
+"""
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+import taiwanbear_kinematics as tk
+from ik import damped_least_squares
+from planner import ClimbPlanner
+from routes import hold_name, parse_route
+
+REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error"}
+
+
+class Batcher:
+    """Coalesce concurrent calls of solve(*arrays) into one call on stacked arrays.
+
+    solve takes arrays with a leading problem axis and returns a tuple of
+    arrays with the same leading axis; every submitter gets back its own rows.
+    """
+
+    def __init__(self, solve, window = 0.002, max_batch = 4096):
+        self.solve = solve
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, *arrays):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((arrays, future))
+        return await future
+
+    async def run(self, executor = None):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            rows = len(items[0][0][0])
+            deadline = loop.time() + self.window
+            while rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                rows += len(item[0][0])
+
+            arrays = [np.concatenate(a) for a in zip(*(arrays for arrays, _ in items))]
+            self.batches += 1
+            self.requests += len(items)
+            try:
+                results = await loop.run_in_executor(executor, self.solve, *arrays)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            i = 0
+            for arrays, future in items:
+                n = len(arrays[0])
+                if not future.done():
+                    future.set_result(tuple(r[i:i + n] for r in results))
+                i += n
+
+
+def _from_elements(data):
+    # (n, 16) column-major elements to (n, 4, 4) matrices
+    return data.reshape(-1, 4, 4).transpose(0, 2, 1)
+
+
+def _to_elements(T):
+    return np.ascontiguousarray(np.swapaxes(T, -1, -2))
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class KinematicsService:
+    """The TaiwanBear kinematics behind a small asyncio HTTP server."""
+
+    def __init__(self, chain = tk.TAIWANBEAR, effectors = tk.EFFECTORS, window = 0.002, ik_options = None,
+                 plan_workers = 1):
+        self.chain = chain
+        self.effectors = list(effectors)
+        self.ik_options = ik_options or {}
+        self.executor = ThreadPoolExecutor(1)
+        self.plan_executor = ThreadPoolExecutor(plan_workers)
+        self.fk = Batcher(self._fk, window)
+        self.ik = Batcher(self._ik, window)
+
+    def _fk(self, Q, A):
+        return (_to_elements(self.chain.forward_kinematics_batch(Q, A)).reshape(len(Q), -1, 16).astype(np.float32),)
+
+    def _ik(self, Q, targets, A):
+        Q, err, iterations, _ = damped_least_squares(self.chain, Q, targets, self.effectors, A, **self.ik_options)
+        return Q, np.linalg.norm(err, axis=2), iterations[:, None].astype(float)
+
+    def _rows(self, body, width):
+        if len(body) == 0 or len(body) % (8 * width):
+            raise HTTPError(400, f"expected rows of {width} float64 values")
+        return np.frombuffer(body, dtype="<f8").reshape(-1, width)
+
+    async def model(self, query, body):
+        return "application/json", json.dumps({
+            "links": self.chain.names,
+            "parents": self.chain.parents.tolist(),
+            "q_config_labels": self.chain.q_config_labels,
+            "effectors": self.effectors,
+            "home": tk.HOME.tolist(),
+        }).encode()
+
+    async def forward_kinematics(self, query, body):
+        dof = self.chain.dof
+        if query.get("base", ["0"])[0] == "1":
+            rows = self._rows(body, dof + 16)
+            Q, A = rows[:, :dof], _from_elements(rows[:, dof:])
+        else:
+            Q = self._rows(body, dof)
+            A = np.broadcast_to(np.eye(4), (len(Q), 4, 4))
+        (T,) = await self.fk.submit(Q, A)
+        return "application/octet-stream", T.tobytes()
+
+    async def inverse_kinematics(self, query, body):
+        dof = self.chain.dof
+        E = len(self.effectors)
+        rows = self._rows(body, dof + 3 * E + 16)
+        Q = rows[:, :dof]
+        targets = rows[:, dof:dof + 3 * E].reshape(-1, E, 3)
+        A = _from_elements(rows[:, dof + 3 * E:])
+        Q, residuals, iterations = await self.ik.submit(Q, targets, A)
+        return "application/octet-stream", np.hstack([Q, residuals, iterations]).astype("<f8").tobytes()
+
+    async def plan(self, query, body):
+        dx = float(query.get("dx", ["0.75"])[0])
+        dy = float(query.get("dy", ["1.0"])[0])
+        try:
+            route = parse_route(body.decode().splitlines(keepends=True), dx, dy)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        def solve():
+            planner = ClimbPlanner(route)
+            return planner, planner.plan()
+
+        try:
+            planner, plan = await asyncio.get_running_loop().run_in_executor(self.plan_executor, solve)
+        except ValueError as e:
+            # Routes the planner cannot start on, e.g. too few holds
+            raise HTTPError(400, str(e))
+        if plan is None:
+            result = {"found": False}
+        else:
+            result = {
+                "found": True,
+                "stances": [[hold_name(planner.holds[h]) for h in stance] for stance in plan.stances],
+                "configs": [q.tolist() for q in plan.configs],
+                "poses": [_to_elements(A).ravel().tolist() for A in plan.poses],
+                "cost": plan.cost,
+                "expanded": plan.expanded,
+                "elapsed": plan.elapsed,
+            }
+        return "application/json", json.dumps(result).encode()
+
+    async def handle(self, reader, writer):
+        handlers = {
+            ("GET", "/model"): self.model,
+            ("POST", "/fk"): self.forward_kinematics,
+            ("POST", "/ik"): self.inverse_kinematics,
+            ("POST", "/plan"): self.plan,
+        }
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                url = urlsplit(target)
+                status, content_type, payload = 200, "text/plain", b""
+                if method == "OPTIONS":
+                    status = 204
+                elif (method, url.path) not in handlers:
+                    known = any(path == url.path for _, path in handlers)
+                    status = 405 if known else 404
+                    payload = REASONS[status].encode()
+                else:
+                    try:
+                        content_type, payload = await handlers[method, url.path](parse_qs(url.query), body)
+                    except HTTPError as e:
+                        status, payload = e.status, str(e).encode()
+                    except Exception as e:
+                        status, payload = 500, repr(e).encode()
+
+                writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                              f"Content-Type: {content_type}\r\n"
+                              f"Content-Length: {len(payload)}\r\n"
+                              "Access-Control-Allow-Origin: *\r\n"
+                              "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+                              "Access-Control-Allow-Headers: Content-Type\r\n"
+                              "\r\n").encode("latin-1") + payload)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host = "127.0.0.1", port = 8765):
+        tasks = [asyncio.create_task(b.run(self.executor)) for b in (self.fk, self.ik)]
+        server = await asyncio.start_server(self.handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    print(f"serving on http://127.0.0.1:{port}")
+    asyncio.run(KinematicsService().serve(port=port))
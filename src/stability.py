@@ -0,0 +1,277 @@
+import numpy as np
+
+import taiwanbear_kinematics as tk
+from routes import SIDE_LEFT, SIDE_RIGHT
+
+# Gravity points down the wall: routes put rows along z and the wall at y = 0
+GRAVITY = np.array([0.0, 0.0, -1.0])
+# The robot hangs on the +y side of the wall, which can only push it away
+WALL_NORMAL = np.array([0.0, 1.0, 0.0])
+
+# Link masses by name prefix, kg; links not listed (joints, effectors) are massless
+MASS_BY_PREFIX = {
+    "TaiwanBear": 12.0,
+    "Link_UpperBody": 8.0,
+    "Head_": 2.0,
+    "Link_Back_Upper": 1.5,
+    "Link_Front_Upper": 1.5,
+    "Link_Back_Lower": 1.0,
+    "Link_Front_Lower": 1.0,
+    "Link_Back_Foot": 0.4,
+    "Link_Front_Foot": 0.4,
+}
+
+
+def link_masses(chain, mass_by_prefix = MASS_BY_PREFIX):
+    """(links,) masses of the chain links from a {name prefix: mass} table."""
+    masses = np.zeros(len(chain))
+    for k, name in enumerate(chain.names):
+        for prefix, mass in mass_by_prefix.items():
+            if name.startswith(prefix):
+                masses[k] = mass
+                break
+    return masses
+
+
+def center_of_mass(T, masses, local = None):
+    """(N, 3) center of mass of the (N, links, 4, 4) link transforms T.
+
+    Each link mass sits at its origin, or at the (links, 3) link-frame points
+    local.
+    """
+    masses = np.asarray(masses, dtype=float)
+    k = np.flatnonzero(masses)
+    points = T[:, k][:, :, :3, 3]
+    if local is not None:
+        points = points + np.einsum("nkij,kj->nki", T[:, k, :3, :3], np.asarray(local, dtype=float)[k])
+    return np.einsum("nki,k->ni", points, masses[k]) / masses[k].sum()
+
+
+def hold_normals(holds):
+    """(H, 3) directions in which the holds can push on a limb.
+
+    Center holds are jugs loaded from above; left and right holds are side
+    pulls, tilted 45 degrees towards the body, which lies right of a left
+    hold and left of a right hold.
+    """
+    normals = np.tile([0.0, 0.0, 1.0], (len(holds), 1))
+    s = np.sqrt(0.5)
+    normals[holds["side"] == SIDE_LEFT] = [-s, 0.0, s]
+    normals[holds["side"] == SIDE_RIGHT] = [s, 0.0, s]
+    return normals
+
+
+def _grasp_matrix(contacts, com):
+    # (N, 6, 3C) map from stacked contact forces to the net force and the
+    # torque about com
+    N, C, _ = contacts.shape
+    r = contacts - com[:, None]
+    G = np.zeros((N, 6, 3 * C))
+    for c in range(C):
+        G[:, :3, 3 * c:3 * c + 3] = np.eye(3)
+        x, y, z = r[:, c, 0], r[:, c, 1], r[:, c, 2]
+        G[:, 3, 3 * c + 1], G[:, 3, 3 * c + 2] = -z, y
+        G[:, 4, 3 * c], G[:, 4, 3 * c + 2] = z, -x
+        G[:, 5, 3 * c], G[:, 5, 3 * c + 1] = -y, x
+    return G
+
+
+def contact_forces(contacts, com, gravity = GRAVITY, regularization = 1e-9):
+    """Minimum-norm contact forces holding up a unit weight at com.
+
+    contacts is (N, C, 3) and com (N, 3).  The (N, C, 3) forces balance the
+    weight (unit force along gravity at com) in force and torque; among all
+    such distributions the one with the least total squared force is taken,
+    which spreads the load over the contacts without any friction model.
+    """
+    N, C, _ = contacts.shape
+    G = _grasp_matrix(contacts, com)
+    w = np.zeros((N, 6, 1))
+    w[:, :3, 0] = -np.asarray(gravity, dtype=float)
+    GGt = G @ G.transpose(0, 2, 1) + regularization * np.eye(6)
+    f = G.transpose(0, 2, 1) @ np.linalg.solve(GGt, w)
+    return f.reshape(N, C, 3)
+
+
+def cone_generators(normals, friction = 0.8, wall = WALL_NORMAL, wall_friction = 0.5, edges = 4):
+    """(..., C, 2 * edges, 3) unit edges of the force cone of every contact.
+
+    A limb on a hold can push along the hold direction (see hold_normals) and
+    press against the wall, each with Coulomb friction: the cone is spanned
+    by the edges of two pyramids, one of half-angle atan(friction) around the
+    hold normal and one of half-angle atan(wall_friction) around the wall
+    normal.  The wall is smooth next to a hold, hence the lower default.
+    """
+    normals = np.asarray(normals, dtype=float)
+    axes = np.stack(np.broadcast_arrays(normals, np.asarray(wall, dtype=float)), axis=-2)
+    # Orthonormal tangents of every axis
+    helper = np.where(np.abs(axes[..., :1]) < 0.9, [1.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+    t1 = np.cross(axes, helper)
+    t1 /= np.linalg.norm(t1, axis=-1, keepdims=True)
+    t2 = np.cross(axes, t1)
+    angles = 2 * np.pi * np.arange(edges) / edges
+    mu = np.array([friction, wall_friction])[:, None, None]
+    g = axes[..., None, :] + mu * (np.cos(angles)[:, None] * t1[..., None, :]
+                                   + np.sin(angles)[:, None] * t2[..., None, :])
+    g /= np.linalg.norm(g, axis=-1, keepdims=True)
+    return g.reshape(*normals.shape[:-1], 2 * edges, 3)
+
+
+def _interior_point(A, b, c, iterations = 20, tol = 1e-6):
+    # Batched Mehrotra predictor-corrector for min c.x, A x = b, x >= 0 with
+    # A (N, m, n), b (N, m) and c (n,).  Problems leave the loop once their
+    # residuals and duality gap are below tol, as the normal equations turn
+    # singular near the optimum.  Returns x and a converged mask.
+    N, m, n = A.shape
+    x = np.ones((N, n))
+    converged = np.zeros(N, dtype=bool)
+
+    def step(v, dv):
+        ratio = -v / np.minimum(dv, -1e-300)
+        return np.minimum(1.0, ratio.min(axis=1, keepdims=True))
+
+    active = np.arange(N)
+    xa, sa, ya = x.copy(), np.ones((N, n)), np.zeros((N, m))
+    tol_p = (tol * (1 + np.linalg.norm(b, axis=1))) ** 2
+    for _ in range(iterations):
+        rp = b - np.einsum("nij,nj->ni", A, xa)
+        rd = c - np.einsum("nji,nj->ni", A, ya) - sa
+        mu = np.einsum("ni,ni->n", xa, sa)[:, None] / n
+        done = ((np.einsum("ni,ni->n", rp, rp) < tol_p) & (np.einsum("ni,ni->n", rd, rd) < tol * tol)
+                & (mu[:, 0] < tol))
+        if done.any():
+            x[active[done]] = xa[done]
+            converged[active[done]] = True
+            keep = ~done
+            active = active[keep]
+            if active.size == 0:
+                return x, converged
+            A, b, tol_p = A[keep], b[keep], tol_p[keep]
+            xa, sa, ya, rp, rd, mu = xa[keep], sa[keep], ya[keep], rp[keep], rd[keep], mu[keep]
+
+        d = xa / sa
+        M = (A * d[:, None]) @ A.transpose(0, 2, 1)
+        # Jacobi scaling keeps M well conditioned as x / s spreads out near
+        # the optimum; the small shift handles rank-deficient stances (e.g.
+        # all contacts on one line).  The inverse serves both the predictor
+        # and the corrector.
+        D = 1 / np.sqrt(np.maximum(np.diagonal(M, axis1=1, axis2=2), 1e-300))
+        M *= D[:, :, None] * D[:, None, :]
+        M[:, np.arange(m), np.arange(m)] += 1e-12
+        Minv = np.linalg.inv(M)
+
+        def direction(rc):
+            rhs = rp - np.einsum("nij,nj->ni", A, rc / sa - d * rd)
+            dy = D * np.einsum("nij,nj->ni", Minv, D * rhs)
+            ds = rd - np.einsum("nji,nj->ni", A, dy)
+            return rc / sa - d * ds, dy, ds
+
+        xs = xa * sa
+        dx, dy, ds = direction(-xs)
+        ap, ad = step(xa, dx), step(sa, ds)
+        mu_affine = np.einsum("ni,ni->n", xa + ap * dx, sa + ad * ds)[:, None] / n
+        dx, dy, ds = direction(-xs - dx * ds + (mu_affine / mu) ** 3 * mu)
+        ap, ad = 0.99 * step(xa, dx), 0.99 * step(sa, ds)
+        xa = xa + ap * dx
+        ya = ya + ad * dy
+        sa = sa + ad * ds
+    x[active] = xa
+    return x, converged
+
+
+def stability_margin(contacts, normals, com, friction = 0.8, gravity = GRAVITY, wall = WALL_NORMAL,
+                     wall_friction = 0.5, max_force = 4.0, iterations = 20, chunk = 1024):
+    """(N,) force-closure margin of N stances, positive if stable.
+
+    contacts are the (N, C, 3) hold positions, normals the (N, C, 3) or
+    (C, 3) hold directions (see hold_normals) and com the (N, 3) centers of
+    mass.  Contact forces are combinations lambda of the cone_generators of
+    every contact, which include pushing against the wall.  The margin is
+    the largest s for which some combination with every lambda >= s and a
+    total of at most max_force balances the weight in force and torque,
+    found with a small batched LP in chunks of chunk stances; it is in units
+    of the weight.  The default max_force lets each of four limbs carry about
+    the full weight.  A positive margin means forces strictly inside every
+    cone can hold the stance, a negative one that even the best split pulls
+    on some cone by -s, and -inf that no forces balance the weight at all.
+    """
+    contacts = np.asarray(contacts, dtype=float)
+    com = np.asarray(com, dtype=float)
+    N, C, _ = contacts.shape
+    normals = np.broadcast_to(normals, contacts.shape)
+    margin = np.empty(N)
+    for n0 in range(0, N, chunk):
+        n1 = min(n0 + chunk, N)
+        margin[n0:n1] = _margin_chunk(contacts[n0:n1], normals[n0:n1], com[n0:n1], friction, gravity, wall,
+                                      wall_friction, max_force, iterations)
+    return margin
+
+
+def _margin_chunk(contacts, normals, com, friction, gravity, wall, wall_friction, max_force, iterations):
+    N, C, _ = contacts.shape
+    V = cone_generators(normals, friction, wall, wall_friction)
+    K = V.shape[2]
+    # (N, 6, C K) wrench of a unit force along every generator
+    GV = np.einsum("nicj,nckj->nick", _grasp_matrix(contacts, com).reshape(N, 6, C, 3), V).reshape(N, 6, C * K)
+    w = np.zeros((N, 6))
+    w[:, :3] = -np.asarray(gravity, dtype=float)
+
+    # lambda = mu + (t - shift) with mu, t >= 0 and a slack on the total:
+    # maximize t subject to GV lambda = w and sum(lambda) <= max_force
+    n = C * K
+    shift = max_force
+    A = np.zeros((N, 7, n + 2))
+    A[:, :6, :n] = GV
+    A[:, :6, n] = GV.sum(axis=2)
+    A[:, 6, :n] = 1.0
+    A[:, 6, n] = n
+    A[:, 6, n + 1] = 1.0
+    b = np.empty((N, 7))
+    b[:, :6] = w + shift * GV.sum(axis=2)
+    b[:, 6] = max_force + n * shift
+    cost = np.zeros(n + 2)
+    cost[n] = -1.0
+    x, converged = _interior_point(A, b, cost, iterations)
+    return np.where(converged, x[:, n] - shift, -np.inf)
+
+
+def support_margin(contacts, com, gravity = GRAVITY):
+    """(N,) signed distance of com from the support polygon, positive inside.
+
+    Contacts and com are projected along gravity onto a plane, and the
+    margin is the smallest distance of the projected com to an edge of the
+    convex hull of the projected contacts (negative outside).  This is the
+    classic test for standing on the ground; on a vertical wall all holds
+    project onto one line and the margin is never positive, use
+    stability_margin there.
+    """
+    g = np.asarray(gravity, dtype=float)
+    g = g / np.linalg.norm(g)
+    # Orthonormal basis (u, v) of the plane normal to gravity
+    u = np.cross(g, [1.0, 0.0, 0.0] if abs(g[0]) < 0.9 else [0.0, 1.0, 0.0])
+    u /= np.linalg.norm(u)
+    v = np.cross(g, u)
+    P = np.stack([contacts @ u, contacts @ v], axis=-1)
+    c = np.stack([com @ u, com @ v], axis=-1)
+
+    N, C, _ = P.shape
+    margin = np.full(N, np.inf)
+    for i in range(C):
+        for j in range(i + 1, C):
+            edge = P[:, j] - P[:, i]
+            normal = np.stack([-edge[:, 1], edge[:, 0]], axis=-1)
+            normal /= np.maximum(np.linalg.norm(normal, axis=1, keepdims=True), 1e-12)
+            side = np.einsum("nci,ni->nc", P - P[:, i, None], normal)
+            # Hull edge if all contacts lie on one side; orient it inwards.  If
+            # they all lie on the edge line the polygon has no inside.
+            others = np.delete(side, [i, j], axis=1)
+            inward = np.where(others.sum(axis=1) >= 0, 1.0, -1.0)
+            hull = np.all(others * inward[:, None] >= -1e-9, axis=1)
+            flat = np.all(np.abs(others) <= 1e-9, axis=1)
+            d = np.einsum("ni,ni->n", c - P[:, i], normal)
+            d = np.where(flat, -np.abs(d), inward * d)
+            margin = np.where(hull, np.minimum(margin, d), margin)
+    return np.where(np.isfinite(margin), margin, -np.inf)
+
+
+TAIWANBEAR_MASSES = link_masses(tk.TAIWANBEAR)
@@ -0,0 +1,146 @@
+"""Velocity-limited joint-space motion between stances, streamed to a frame file.
+
+    python trajectory.py ../public/route2.txt climb.frames
+
+Waypoints are (q, A) pairs of a joint vector and a base transform, e.g.
+zip(plan.configs, plan.poses) of a planner.Plan.  Frames are produced in
+batches of at most `batch`, so memory stays constant however long the climb.
+"""
+import math
+import struct
+import sys
+
+import numpy as np
+
+import taiwanbear_kinematics as tk
+
+# Frame file layout (little endian), read by loadTrajectory in playback.ts:
+#   magic b"TBFRAME1", uint32 links, uint32 frames, float32 fps, uint32 names
+#   length, link names joined by "\n" and zero padded to 4 bytes, then for
+#   every frame and link a 4x4 float32 world transform in column-major order
+#   like Matrix4.elements in three.js.
+MAGIC = b"TBFRAME1"
+_HEADER = struct.Struct("<8sIIfI")
+
+# Peak speed of the smoothstep 3s^2 - 2s^3 relative to a linear move
+_PEAK = 1.5
+
+
+def _smoothstep(s):
+    return s * s * (3.0 - 2.0 * s)
+
+
+def segment_duration(q0, q1, A0, A1, max_velocity = 1.0, max_base_velocity = 0.5):
+    """Shortest time for a smoothstep move q0 -> q1, A0 -> A1 within the limits.
+
+    max_velocity is the joint speed limit in rad/s and max_base_velocity the
+    speed limit of the body in units/s.
+    """
+    joints = np.abs(np.asarray(q1) - np.asarray(q0)).max(initial=0.0) / max_velocity
+    base = np.linalg.norm(np.asarray(A1)[:3, 3] - np.asarray(A0)[:3, 3]) / max_base_velocity
+    return _PEAK * max(joints, base)
+
+
+def interpolate(waypoints, fps = 30.0, max_velocity = 1.0, max_base_velocity = 0.5, batch = 256):
+    """Yield (Q, A) batches of frames moving through the waypoints.
+
+    Consecutive waypoints are joined by a smoothstep in joint space that
+    starts and stops at rest; its duration is rounded up to whole frames so
+    no joint or body speed exceeds the limits.  The base translation follows
+    the same profile and the base rotation must be the same at every waypoint.
+    The last waypoint is the final frame.
+    """
+    waypoints = iter(waypoints)
+    try:
+        q0, A0 = next(waypoints)
+    except StopIteration:
+        return
+    q0 = np.asarray(q0, dtype=float)
+    A0 = np.asarray(A0, dtype=float)
+    for q1, A1 in waypoints:
+        q1 = np.asarray(q1, dtype=float)
+        A1 = np.asarray(A1, dtype=float)
+        if not np.allclose(A0[:3, :3], A1[:3, :3]):
+            raise ValueError("waypoint base rotations differ")
+        n = max(1, math.ceil(segment_duration(q0, q1, A0, A1, max_velocity, max_base_velocity) * fps))
+        for i0 in range(0, n, batch):
+            s = _smoothstep(np.arange(i0, min(n, i0 + batch)) / n)
+            Q = q0 + s[:, None] * (q1 - q0)
+            A = np.broadcast_to(A0, (len(s), 4, 4)).copy()
+            A[:, :3, 3] += s[:, None] * (A1[:3, 3] - A0[:3, 3])
+            yield Q, A
+        q0, A0 = q1, A1
+    yield q0[None], A0[None]
+
+
+def frames(waypoints, chain = tk.TAIWANBEAR, **options):
+    """interpolate with the (n, links, 4, 4) link transforms of every batch: yields (Q, A, T)."""
+    for Q, A in interpolate(waypoints, **options):
+        yield Q, A, chain.forward_kinematics_batch(Q, A)
+
+
+class FrameWriter:
+    """Append link transforms to a frame file; the frame count is written on close."""
+
+    def __init__(self, path, names, fps):
+        self.names = list(names)
+        self.frames = 0
+        self.fps = fps
+        blob = "\n".join(self.names).encode()
+        blob += b"\0" * (-len(blob) % 4)
+        self.file = open(path, "wb")
+        self.file.write(_HEADER.pack(MAGIC, len(self.names), 0, fps, len(blob)))
+        self.file.write(blob)
+
+    def write(self, T):
+        """Write (n, len(names), 4, 4) world transforms."""
+        np.ascontiguousarray(T.transpose(0, 1, 3, 2), dtype="<f4").tofile(self.file)
+        self.frames += len(T)
+
+    def close(self):
+        if not self.file.closed:
+            # Frame count right after the magic and the link count
+            self.file.seek(12)
+            self.file.write(struct.pack("<I", self.frames))
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_trajectory(path, waypoints, chain = tk.TAIWANBEAR, links = None, fps = 30.0, **options):
+    """Stream the motion through waypoints to a frame file; returns the frame count.
+
+    links are the names of the links to store, all links of chain by default.
+    """
+    names = chain.names if links is None else list(links)
+    k = [chain.index[name] for name in names]
+    with FrameWriter(path, names, fps) as writer:
+        for _, _, T in frames(waypoints, chain, fps=fps, **options):
+            writer.write(T[:, k])
+    return writer.frames
+
+
+def read_frames(path):
+    """(names, fps, T) of a frame file, T a read-only (frames, links, 4, 4) view of the file."""
+    with open(path, "rb") as f:
+        magic, links, count, fps, size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a frame file")
+        names = f.read(size).rstrip(b"\0").decode().split("\n")
+    data = np.memmap(path, dtype="<f4", mode="r", offset=_HEADER.size + size, shape=(count, links, 4, 4))
+    return names, fps, data.transpose(0, 1, 3, 2)
+
+
+if __name__ == "__main__":
+    from planner import ClimbPlanner
+    from routes import load_route
+
+    plan = ClimbPlanner(load_route(sys.argv[1])).plan()
+    if plan is None:
+        sys.exit("no plan found")
+    count = write_trajectory(sys.argv[2], zip(plan.configs, plan.poses))
+    print(f"{len(plan.stances)} stances, {count} frames")
@@ -0,0 +1,62 @@
+import inspect
+
+import numpy as np
+import pytest
+
+import taiwanbear_kinematics as tk
+from collision import TAIWANBEAR, segment_distances
+from planner import ClimbPlanner
+
+
+def sampled_distance(p0, p1, q0, q1, samples = 401):
+    t = np.linspace(0.0, 1.0, samples)[:, None]
+    p = p0 + t * (p1 - p0)
+    q = q0 + t * (q1 - q0)
+    return np.linalg.norm(p[:, None] - q[None], axis=2).min()
+
+
+def test_segment_distances_match_sampling():
+    rng = np.random.default_rng(0)
+    p0, p1, q0, q1 = rng.normal(size=(4, 200, 3))
+    d = segment_distances(p0, p1, q0, q1)
+    for n in range(len(d)):
+        sampled = sampled_distance(p0[n], p1[n], q0[n], q1[n])
+        # Sampling can only overestimate, by at most about one sample step
+        assert d[n] <= sampled + 1e-12
+        assert d[n] >= sampled - 0.02
+
+
+@pytest.mark.parametrize("p0, p1, q0, q1, expected", [
+    # Parallel, overlapping
+    ([0, 0, 0], [1, 0, 0], [0.5, 1, 0], [1.5, 1, 0], 1.0),
+    # Parallel, disjoint
+    ([0, 0, 0], [1, 0, 0], [2, 1, 0], [3, 1, 0], np.sqrt(2)),
+    # Crossing
+    ([-1, 0, 0], [1, 0, 0], [0, -1, 0.5], [0, 1, 0.5], 0.5),
+    # Degenerate segment (a point)
+    ([0, 0, 0], [0, 0, 0], [1, -1, 0], [1, 1, 0], 1.0),
+])
+def test_segment_distances_special_cases(p0, p1, q0, q1, expected):
+    p0, p1, q0, q1 = (np.array(v, dtype=float) for v in (p0, p1, q0, q1))
+    assert segment_distances(p0, p1, q0, q1) == pytest.approx(expected, abs=1e-9)
+    assert segment_distances(q0, q1, p0, p1) == pytest.approx(expected, abs=1e-9)
+
+
+def home_at(y):
+    A = np.eye(4)
+    A[1, 3] = y
+    return tk.forward_kinematics_batch(tk.HOME, A)
+
+
+def test_home_at_planner_height_is_collision_free():
+    height = inspect.signature(ClimbPlanner).parameters["height"].default
+    T = home_at(height)
+    assert np.all(TAIWANBEAR.self_distances(T) > 0)
+    assert np.all(TAIWANBEAR.wall_distances(T) > 0)
+    assert TAIWANBEAR.collision_free(T)[0]
+
+
+def test_body_pushed_into_wall_collides():
+    T = home_at(0.1)
+    assert TAIWANBEAR.collision_free(T, wall=False)[0]
+    assert not TAIWANBEAR.collision_free(T)[0]
@@ -0,0 +1,46 @@
+import numpy as np
+
+import taiwanbear_kinematics as tk
+from ik import damped_least_squares, effector_positions
+
+
+def reachable_targets(n, spread = 0.5, seed = 0):
+    # Effector positions of random joint vectors around HOME
+    rng = np.random.default_rng(seed)
+    Q = tk.HOME + rng.uniform(-spread, spread, (n, tk.DOF))
+    return effector_positions(tk.TAIWANBEAR, tk.forward_kinematics_batch(Q), tk.EFFECTORS)
+
+
+def test_reachable_targets_converge_in_under_ten_iterations():
+    targets = reachable_targets(500)
+    Q, err, iterations, T = damped_least_squares(tk.TAIWANBEAR, tk.HOME, targets, tk.EFFECTORS)
+    assert np.linalg.norm(err, axis=2).max() <= 1e-3
+    assert iterations.max() < 10
+    np.testing.assert_allclose(T, tk.forward_kinematics_batch(Q), atol=1e-12)
+    np.testing.assert_allclose(targets - effector_positions(tk.TAIWANBEAR, T, tk.EFFECTORS), err, atol=1e-12)
+
+
+def test_warm_start_at_a_solution_needs_no_iterations():
+    targets = reachable_targets(20, seed=1)
+    Q, _, _, _ = damped_least_squares(tk.TAIWANBEAR, tk.HOME, targets, tk.EFFECTORS)
+    _, err, iterations, _ = damped_least_squares(tk.TAIWANBEAR, Q, targets, tk.EFFECTORS)
+    assert np.all(iterations == 0)
+    assert np.linalg.norm(err, axis=2).max() <= 1e-3
+
+
+def test_base_transform_moves_the_targets():
+    targets = reachable_targets(20, seed=2)
+    A = np.eye(4)
+    A[:3, 3] = [0.3, 1.2, -0.4]
+    Q, err, _, T = damped_least_squares(tk.TAIWANBEAR, tk.HOME, targets + A[:3, 3], tk.EFFECTORS, A)
+    assert np.linalg.norm(err, axis=2).max() <= 1e-3
+    np.testing.assert_allclose(T, tk.forward_kinematics_batch(Q, A), atol=1e-12)
+
+
+def test_single_problem_drops_the_batch_axis():
+    target = reachable_targets(1, seed=3)[0]
+    q, err, iterations, T = tk.inverse_kinematics(None, target)
+    assert q.shape == (tk.DOF,)
+    assert err.shape == (len(tk.EFFECTORS), 3)
+    assert np.ndim(iterations) == 0
+    assert np.linalg.norm(err, axis=1).max() <= 1e-3
@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+
+import taiwanbear_kinematics as tk
+from ik_cache import IKCache, LRUCache, namespace
+from planner import ClimbPlanner
+from routes import load_route
+
+ROUTE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "route2.txt")
+
+
+def random_poses(n, seed = 0):
+    rng = np.random.default_rng(seed)
+    A = np.tile(np.eye(4), (n, 1, 1))
+    for a in A:
+        a[:3, :3] = np.linalg.qr(rng.normal(size=(3, 3)))[0]
+        a[:3, 3] = rng.normal(size=3)
+    return A
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_namespace_separates_settings():
+    assert namespace(tk.HOME, 1.2) == namespace(tk.HOME.copy(), 1.2)
+    assert namespace(tk.HOME, 1.2) != namespace(tk.HOME, 1.3)
+    assert namespace(tk.HOME) != namespace(tk.HOME.astype(np.float32))
+
+
+def test_keys_follow_the_body():
+    # The same layout seen from a moved and turned body maps to the same key
+    cache = IKCache()
+    targets = np.random.default_rng(1).normal(size=(1, 4, 3))
+    A, B = random_poses(2)
+    moved = np.einsum("ij,nej->nei", B[:3, :3] @ A[:3, :3].T, targets - A[:3, 3]) + B[:3, 3]
+    assert cache.keys(targets, A[None]) == cache.keys(moved, B[None])
+    assert cache.keys(targets, A[None]) != cache.keys(targets + 0.01, A[None])
+    assert cache.keys(targets, A[None], b"x") != cache.keys(targets, A[None], b"y")
+
+
+def test_disk_round_trip(tmp_path):
+    path = str(tmp_path / "ik.sqlite")
+    keys = [b"a", b"b"]
+    Q = np.random.default_rng(2).normal(size=(2, tk.DOF))
+    shifts = np.array([[0.1, 0.2, 0.3], [0.0, 0.0, 0.0]])
+    residuals = np.array([[1e-3] * 4, [2e-3] * 4])
+    cache = IKCache(path)
+    cache.put_many(keys, Q, shifts, residuals)
+    cache.close()
+
+    cache = IKCache(path)
+    values = cache.get_many([b"b", b"c", b"a"])
+    assert values[1] is None
+    for value, n in zip([values[2], values[0]], range(2)):
+        np.testing.assert_array_equal(value[0], Q[n])
+        np.testing.assert_array_equal(value[1], shifts[n])
+        np.testing.assert_array_equal(value[2], residuals[n])
+    assert cache.disk_hits == 2
+    cache.close()
+
+
+def test_planner_stores_only_converged_solves():
+    # Few iterations, so some solves fail
+    planner = ClimbPlanner(load_route(ROUTE), solutions=IKCache(), ik_options={"max_iterations": 4})
+    start = planner.start_stance()
+    stances = [start] + [new for _, _, new in planner.moves(start)]
+    feasible, _, _, residuals = planner.solve(stances)
+    solved = np.isfinite(residuals).all(axis=1)
+    converged = solved & (residuals.max(axis=1) <= planner.tol)
+    assert solved.sum() > converged.sum() > 0
+    assert len(planner.solutions.memory) == len({stances[n] for n in np.flatnonzero(converged)})
@@ -0,0 +1,67 @@
+import numpy as np
+
+import taiwanbear_kinematics as tk
+from kinematic_chain import IncrementalKinematics
+
+CHAIN = tk.TAIWANBEAR
+
+
+def test_matches_full_fk_after_updates():
+    rng = np.random.default_rng(0)
+    ik = IncrementalKinematics(CHAIN, tk.HOME)
+    q = tk.HOME.copy()
+    A = np.eye(4)
+    for step in range(20):
+        if step % 3 == 0:
+            q = q + rng.uniform(-0.3, 0.3, tk.DOF) * (rng.random(tk.DOF) < 0.2)
+            ik.set_q(q)
+        elif step % 3 == 1:
+            name = CHAIN.joint_names[rng.integers(len(CHAIN.joint_names))]
+            value = rng.uniform(-0.5, 0.5, CHAIN.joint_types[CHAIN.index[name]])
+            ik.set_joint(name, value)
+            i = CHAIN.q_config_index[name]
+            q[i:i + len(value)] = value
+        else:
+            A = np.eye(4)
+            A[:3, 3] = rng.normal(size=3)
+            ik.set_base(A)
+        expected = CHAIN.forward_kinematics(q, A, out=np.empty((len(CHAIN), 4, 4)))
+        k = rng.integers(len(CHAIN))
+        np.testing.assert_allclose(ik.transform(k), expected[k], atol=1e-12)
+        np.testing.assert_allclose(ik.transforms(), expected, atol=1e-12)
+
+
+def test_only_stale_links_are_updated():
+    ik = IncrementalKinematics(CHAIN, tk.HOME)
+    ik.transforms()
+    before = ik.updated
+    name = "RJoint_Back_Lower_Z_L"
+    ik.set_joint(name, 0.3)
+    ik.transforms()
+    assert ik.updated - before == np.count_nonzero(CHAIN.descendants[CHAIN.index[name]])
+    # Unchanged angles mark nothing stale
+    ik.set_q(ik.q)
+    before = ik.updated
+    ik.transforms()
+    assert ik.updated == before
+
+
+def test_transform_is_a_copy():
+    ik = IncrementalKinematics(CHAIN, tk.HOME)
+    k = CHAIN.index["Effector_Front_L"]
+    T = ik.transform(k)
+    kept = T.copy()
+    ik.set_q(tk.HOME + 0.2)
+    ik.transform(k)
+    np.testing.assert_array_equal(T, kept)
+
+
+def test_scalar_fk_does_not_disturb_incremental():
+    # Interleaved scalar FK on the chain must not leak into the incremental state
+    ik = IncrementalKinematics(CHAIN, tk.HOME)
+    ik.set_q(tk.HOME + 0.1)
+    k = CHAIN.index["Effector_Back_R"]
+    CHAIN.forward_kinematics(tk.HOME - 0.4)
+    expected = CHAIN.forward_kinematics(tk.HOME + 0.1, out=np.empty((len(CHAIN), 4, 4)))[k]
+    np.testing.assert_allclose(ik.transform(k), expected, atol=1e-12)
+    assert ik._rotation is not CHAIN._rotation and ik._scratch is not CHAIN._scratch
@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+import taiwanbear_kinematics as tk
+from kinematic_chain import JOINT_XYZ, FKWorkspace, KinematicChain
+
+CHAIN = tk.TAIWANBEAR
+
+
+def random_poses(n, seed = 0):
+    return tk.HOME + np.random.default_rng(seed).uniform(-0.8, 0.8, (n, tk.DOF))
+
+
+def random_base(seed = 0):
+    rng = np.random.default_rng(seed)
+    A = np.eye(4)
+    A[:3, :3] = np.linalg.qr(rng.normal(size=(3, 3)))[0]
+    A[:3, 3] = rng.normal(size=3)
+    return A
+
+
+def angular_velocity(R0, R1, R, h):
+    # Axis w of the central difference dR/dq = [w]x R
+    W = (R1 - R0) / (2 * h) @ R.T
+    return np.array([W[2, 1], W[0, 2], W[1, 0]])
+
+
+def test_batch_matches_scalar():
+    Q = random_poses(5)
+    A = random_base()
+    T = CHAIN.forward_kinematics_batch(Q, A)
+    for n, q in enumerate(Q):
+        np.testing.assert_allclose(T[n], CHAIN.forward_kinematics(q, A), atol=1e-12)
+
+
+@pytest.mark.parametrize("dtype, rows", [(np.float64, 4), (np.float32, 3)])
+def test_into_matches_batch(dtype, rows):
+    # Chunks of 7 over 20 poses leave a partial last chunk
+    Q = random_poses(20, seed=1)
+    A = np.stack([random_base(seed) for seed in range(20)])
+    links = ["Effector_Front_R", 0, "Effector_Back_L"]
+    out = np.empty((len(links), len(Q), rows, 4), dtype=dtype)
+    tk.forward_kinematics_into(Q, out, A, links=links, workspace=FKWorkspace(CHAIN, 7))
+    T = CHAIN.forward_kinematics_batch(Q, A)
+    for i, k in enumerate(links):
+        k = CHAIN.index[k] if isinstance(k, str) else k
+        np.testing.assert_allclose(out[i], T[:, k, :rows], atol=1e-5 if dtype == np.float32 else 1e-12)
+
+
+def test_into_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        tk.forward_kinematics_into(random_poses(3), np.empty((len(CHAIN), 2, 4, 4)))
+
+
+def test_workspace_reuse():
+    # A workspace sized for more poses gives the same result on a smaller batch
+    workspace = FKWorkspace(CHAIN, 16)
+    for n in (16, 5, 16):
+        Q = random_poses(n, seed=n)
+        np.testing.assert_allclose(CHAIN.forward_kinematics_batch(Q, workspace=workspace),
+                                   CHAIN.forward_kinematics_batch(Q), atol=1e-12)
+
+
+def test_joint_axes_match_finite_differences():
+    # Every joint column rotates its own link about the recovered axis
+    Q = random_poses(3, seed=2)
+    T = CHAIN.forward_kinematics_batch(Q)
+    axes, _ = CHAIN.joint_axes(T, Q)
+    h = 1e-6
+    owner = {}
+    for k in CHAIN.joint_links:
+        for d in range(3 if CHAIN.joint_types[k] == JOINT_XYZ else 1):
+            owner[CHAIN.q_index[k] + d] = k
+    assert sorted(owner) == list(range(tk.DOF))
+    for col, k in owner.items():
+        dq = np.zeros(tk.DOF)
+        dq[col] = h
+        T0 = CHAIN.forward_kinematics_batch(Q - dq)
+        T1 = CHAIN.forward_kinematics_batch(Q + dq)
+        for n in range(len(Q)):
+            w = angular_velocity(T0[n, k, :3, :3], T1[n, k, :3, :3], T[n, k, :3, :3], h)
+            np.testing.assert_allclose(w, axes[n, col], atol=1e-6)
+
+
+def test_jacobian_matches_central_differences():
+    Q = random_poses(3, seed=3)
+    A = random_base(seed=3)
+    J = CHAIN.jacobian(Q, tk.EFFECTORS, A)
+    e = [CHAIN.index[name] for name in tk.EFFECTORS]
+    T = CHAIN.forward_kinematics_batch(Q, A)[:, e]
+    h = 1e-6
+    for col in range(tk.DOF):
+        dq = np.zeros(tk.DOF)
+        dq[col] = h
+        T0 = CHAIN.forward_kinematics_batch(Q - dq, A)[:, e]
+        T1 = CHAIN.forward_kinematics_batch(Q + dq, A)[:, e]
+        np.testing.assert_allclose(J[:, :, :3, col], (T1[..., :3, 3] - T0[..., :3, 3]) / (2 * h), atol=1e-6)
+        for n in range(len(Q)):
+            for i in range(len(e)):
+                w = angular_velocity(T0[n, i, :3, :3], T1[n, i, :3, :3], T[n, i, :3, :3], h)
+                np.testing.assert_allclose(J[n, i, 3:, col], w, atol=1e-6)
+
+
+def test_save_load_round_trip(tmp_path):
+    path = tmp_path / "chain.npz"
+    CHAIN.save(path)
+    chain = KinematicChain.load(path)
+    assert chain.names == CHAIN.names
+    np.testing.assert_array_equal(chain.parents, CHAIN.parents)
+    np.testing.assert_array_equal(chain.joint_types, CHAIN.joint_types)
+    np.testing.assert_array_equal(chain.offsets, CHAIN.offsets)
+    Q = random_poses(3)
+    np.testing.assert_array_equal(chain.forward_kinematics_batch(Q), CHAIN.forward_kinematics_batch(Q))
+
+
+def test_load_rejects_mismatched_joint_types(tmp_path):
+    path = tmp_path / "chain.npz"
+    joint_types = CHAIN.joint_types.copy()
+    joint_types[joint_types == JOINT_XYZ] = 1
+    np.savez(path, names=np.array(CHAIN.names), parents=CHAIN.parents, joint_types=joint_types,
+             offsets=CHAIN.offsets)
+    with pytest.raises(ValueError):
+        KinematicChain.load(path)
+
+
+def test_model_file_matches_links():
+    np.testing.assert_array_equal(KinematicChain(tk.LINKS).offsets, CHAIN.offsets)
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+import planner as planner_module
+import taiwanbear_kinematics as tk
+from collision import TAIWANBEAR as TAIWANBEAR_COLLISION
+from ik import effector_positions
+from planner import ClimbPlanner
+from routes import legal_holds, load_route
+
+ROUTE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "route1.txt")
+
+
+@pytest.fixture(scope="module")
+def planned():
+    planner = ClimbPlanner(load_route(ROUTE))
+    return planner, planner.plan()
+
+
+def test_plan_reaches_the_top(planned):
+    planner, plan = planned
+    assert plan is not None
+    assert plan.stances[0] == planner.start_stance()
+    assert planner.is_goal(plan.stances[-1])
+    for a, b in zip(plan.stances, plan.stances[1:]):
+        assert sum(x != y for x, y in zip(a, b)) == 1
+        assert len(set(b)) == len(b)
+
+
+def test_plan_poses_hold_on_without_collisions(planned):
+    planner, plan = planned
+    Q, poses = np.array(plan.configs), np.array(plan.poses)
+    T = tk.forward_kinematics_batch(Q, poses)
+    targets = planner.positions[np.array(plan.stances)]
+    assert np.linalg.norm(effector_positions(tk.TAIWANBEAR, T, tk.EFFECTORS) - targets, axis=2).max() <= planner.tol
+    assert np.all(TAIWANBEAR_COLLISION.collision_free(T))
+
+
+def test_body_only_moves_body_shift_off_the_wall(planned):
+    planner, plan = planned
+    y = np.array(plan.poses)[:, 1, 3]
+    assert np.all(np.abs(y - planner.height) <= planner.body_shift + 1e-12)
+
+
+def test_moves_change_one_limb_to_a_free_legal_hold(planned):
+    planner, plan = planned
+    stance = plan.stances[1]
+    moves = planner.moves(stance)
+    assert moves
+    for limb, h, new in moves:
+        assert new[limb] == h and h not in stance
+        assert new[:limb] + new[limb + 1:] == stance[:limb] + stance[limb + 1:]
+        assert np.linalg.norm(planner.positions[h] - planner.positions[stance[limb]]) <= planner.max_move
+        assert legal_holds(planner.holds[[h]], planner.body_positions(new))[0]
+
+
+def test_admissible_is_cached(planned, monkeypatch):
+    planner, plan = planned
+    stances = [new for _, _, new in planner.moves(plan.stances[1])]
+    first = planner.admissible(stances)
+    assert first.any() and not first.all()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("stability tested again")
+
+    monkeypatch.setattr(planner_module, "stability_margin", fail)
+    assert np.array_equal(planner.admissible(stances), first)
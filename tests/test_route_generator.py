@@ -0,0 +1,37 @@
+import numpy as np
+
+from route_generator import CHARS, EMPTY, JUG, RouteGenerator
+from routes import parse_route
+
+
+def test_candidates_start_from_jugs():
+    generator = RouteGenerator(level=7, seed=0)
+    codes = generator.candidates(256)
+    assert codes.shape == (256, generator.rows, generator.width)
+    assert codes.max() < len(CHARS)
+    assert np.all(np.any(codes[:, -2:] == JUG, axis=2))
+
+
+def test_text_round_trips():
+    generator = RouteGenerator(level=4, seed=1)
+    grid = generator.candidates(1)[0]
+    route = parse_route(generator.text(grid).splitlines(keepends=True))
+    assert route.level == 4
+    assert len(route.holds) == np.count_nonzero(grid != EMPTY)
+
+
+def test_climbable_needs_holds_within_reach():
+    generator = RouteGenerator()
+    full = np.full((generator.rows, generator.width), JUG, dtype=np.uint8)
+    gap = full.copy()
+    # Four empty rows are 5 m of wall, twice max_move
+    gap[3:7] = EMPTY
+    assert generator.climbable(np.array([full, gap])).tolist() == [True, False]
+
+
+def test_generate_with_planner_keeps_solved_routes():
+    generator = RouteGenerator(level=3, seed=0)
+    codes = np.concatenate(list(generator.generate(1, batch=64, max_expansions=2000)))
+    assert len(codes) == 1
+    assert generator.climbable(codes).all()
+    assert generator.solvable(codes).all()
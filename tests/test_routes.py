@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from routes import HOLD_DTYPE, SIDE_ANY, SIDE_LEFT, SIDE_RIGHT, HoldIndex, legal_holds, parse_route
+
+
+def random_holds(n, seed = 0):
+    rng = np.random.default_rng(seed)
+    holds = np.zeros(n, dtype=HOLD_DTYPE)
+    holds["type"] = "U"
+    holds["position"][:, 0] = rng.uniform(-4, 4, n)
+    holds["position"][:, 2] = rng.uniform(-6, 6, n)
+    holds["side"] = rng.choice([SIDE_ANY, SIDE_LEFT, SIDE_RIGHT], n)
+    return holds
+
+
+@pytest.mark.parametrize("cell_size", [0.3, 1.0, 5.0])
+def test_neighbors_match_brute_force(cell_size):
+    holds = random_holds(200)
+    index = HoldIndex(holds, cell_size)
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        point = np.array([rng.uniform(-6, 6), 0.0, rng.uniform(-8, 8)])
+        radius = rng.uniform(0.1, 3.0)
+        expected = np.flatnonzero(np.linalg.norm(holds["position"] - point, axis=1) <= radius)
+        np.testing.assert_array_equal(np.sort(index.neighbors(point, radius)), expected)
+
+
+@pytest.mark.parametrize("cell_size", [0.3, 1.0, 5.0])
+def test_closest_matches_brute_force(cell_size):
+    holds = random_holds(200, seed=2)
+    index = HoldIndex(holds, cell_size)
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        # Points well outside the holds too
+        point = np.array([rng.uniform(-12, 12), 0.0, rng.uniform(-15, 15)])
+        coM = np.array([rng.uniform(-4, 4), 0.0, 0.0])
+        d = np.linalg.norm(holds["position"] - point, axis=1)
+        assert d[index.closest(point)] == d.min()
+        legal = legal_holds(holds, coM)
+        assert d[index.closest(point, coM)] == d[legal].min()
+
+
+def test_closest_without_legal_holds():
+    holds = random_holds(10)
+    holds["side"] = SIDE_LEFT
+    holds["position"][:, 0] = np.minimum(holds["position"][:, 0], 0.0)
+    assert HoldIndex(holds).closest([0.0, 0.0, 0.0], coM=[1.0, 0.0, 0.0]) == -1
+
+
+def test_parse_route_positions():
+    route = parse_route(["3\n", "U.\n", ".R\n"])
+    assert route.level == 3
+    assert list(route.holds["type"]) == ["U", "R"]
+    # Height counts the level line and the empty line after the last newline
+    np.testing.assert_allclose(route.holds["position"], [[0.0, 0.0, 0.0], [-0.75, 0.0, -1.0]])
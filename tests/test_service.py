@@ -0,0 +1,101 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import taiwanbear_kinematics as tk
+from service import Batcher, KinematicsService
+
+
+def run_batcher(solve, calls, **options):
+    # Submit every call at once and return the results and the batcher
+    async def main():
+        batcher = Batcher(solve, **options)
+        task = asyncio.create_task(batcher.run())
+        try:
+            results = await asyncio.gather(*(batcher.submit(*arrays) for arrays in calls), return_exceptions=True)
+        finally:
+            task.cancel()
+        return results, batcher
+
+    return asyncio.run(main())
+
+
+def test_batcher_coalesces_concurrent_calls():
+    sizes = []
+
+    def solve(x, y):
+        sizes.append(len(x))
+        return x + y, x * y
+
+    calls = [(np.arange(n, dtype=float), np.full(n, 2.0)) for n in (1, 3, 2)]
+    results, batcher = run_batcher(solve, calls, window=0.05)
+    assert sizes == [6] and (batcher.batches, batcher.requests) == (1, 3)
+    for (x, y), (total, product) in zip(calls, results):
+        np.testing.assert_array_equal(total, x + y)
+        np.testing.assert_array_equal(product, x * y)
+
+
+def test_batcher_splits_at_max_batch():
+    sizes = []
+
+    def solve(x):
+        sizes.append(len(x))
+        return (-x,)
+
+    calls = [(np.full(2, float(k)),) for k in range(5)]
+    results, _ = run_batcher(solve, calls, window=0.05, max_batch=4)
+    assert sizes == [4, 4, 2]
+    for (x,), (y,) in zip(calls, results):
+        np.testing.assert_array_equal(y, -x)
+
+
+def test_batcher_passes_errors_to_every_caller():
+    def solve(x):
+        raise ValueError("bad batch")
+
+    results, _ = run_batcher(solve, [(np.zeros(1),), (np.zeros(2),)], window=0.05)
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_fk_endpoint_returns_column_major_float32():
+    Q = tk.HOME + np.random.default_rng(0).uniform(-0.5, 0.5, (3, tk.DOF))
+
+    async def main():
+        service = KinematicsService()
+        tasks = [asyncio.create_task(b.run(service.executor)) for b in (service.fk, service.ik)]
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            body = Q.astype("<f8").tobytes()
+            writer.write(f"POST /fk HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                         + body)
+            response = await reader.read()
+            writer.close()
+        finally:
+            server.close()
+            for task in tasks:
+                task.cancel()
+        return response
+
+    head, _, payload = asyncio.run(main()).partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    T = np.frombuffer(payload, dtype="<f4").reshape(len(Q), len(tk.TAIWANBEAR.names), 4, 4).transpose(0, 1, 3, 2)
+    np.testing.assert_allclose(T, tk.forward_kinematics_batch(Q), atol=1e-5)
+
+
+@pytest.mark.parametrize("path, status", [("/nowhere", 404), ("/model", 405)])
+def test_unknown_requests_are_refused(path, status):
+    async def main():
+        service = KinematicsService()
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(f"POST {path} HTTP/1.1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+        finally:
+            server.close()
+        return response
+
+    assert asyncio.run(main()).startswith(f"HTTP/1.1 {status}".encode())
@@ -0,0 +1,118 @@
+import itertools
+
+import numpy as np
+
+import stability
+from stability import GRAVITY, _interior_point, cone_generators, stability_margin
+
+
+def basic_solutions(A, b, fixed = ()):
+    # Bases of A x = b that contain the columns fixed, and their solutions
+    m, n = A.shape
+    others = [j for j in range(n) if j not in fixed]
+    bases = np.array([list(fixed) + list(rest) for rest in itertools.combinations(others, m - len(fixed))])
+    B = A[:, bases].transpose(1, 0, 2)
+    regular = np.abs(np.linalg.det(B)) > 1e-9
+    bases, B = bases[regular], B[regular]
+    return bases, np.linalg.solve(B, np.broadcast_to(b, (len(B), m))[..., None])[..., 0]
+
+
+def reference_lp(A, b, c):
+    # min c.x, A x = b, x >= 0 as the best basic feasible solution
+    bases, x = basic_solutions(A, b)
+    feasible = np.all(x >= -1e-9, axis=1)
+    return np.einsum("ki,ki->k", c[bases[feasible]], x[feasible]).min()
+
+
+def reference_margin(contacts, normals, com, max_force):
+    # max t with GV lambda = w, lambda >= t and sum(lambda) <= max_force: the
+    # vertices of lambda = mu + t with mu and the slack >= 0 and t free, so
+    # always basic
+    G = stability._grasp_matrix(contacts[None], com[None])[0]
+    GV = np.einsum("icj,ckj->ick", G.reshape(6, -1, 3), cone_generators(normals)).reshape(6, -1)
+    n = GV.shape[1]
+    A = np.zeros((7, n + 2))
+    A[:6, 0] = GV.sum(axis=1)
+    A[6, 0] = n
+    A[:6, 1:n + 1] = GV
+    A[6, 1:] = 1.0
+    b = np.zeros(7)
+    b[:3] = -GRAVITY
+    b[6] = max_force
+    _, x = basic_solutions(A, b, fixed=(0,))
+    feasible = np.all(x[:, 1:] >= -1e-9, axis=1)
+    return x[feasible, 0].max() if feasible.any() else -np.inf
+
+
+def square_stance(size = 1.0, com_offset = (0.0, 0.3, 0.0)):
+    # Four jugs on the corners of a square on the wall around the center of mass
+    h = size / 2
+    contacts = np.array([[-h, 0.0, -h], [h, 0.0, -h], [-h, 0.0, h], [h, 0.0, h]])
+    normals = np.tile([0.0, 0.0, 1.0], (4, 1))
+    return contacts, normals, np.array(com_offset, dtype=float)
+
+
+def test_interior_point_matches_vertex_enumeration():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        m, n = 3, 7
+        A = rng.normal(size=(m, n))
+        b = A @ rng.uniform(0.1, 1.0, n)
+        # c in the interior of the dual cone, so the problem is bounded
+        c = A.T @ rng.normal(size=m) + rng.uniform(0.1, 1.0, n)
+        x, converged = _interior_point(A[None], b[None], c)
+        assert converged[0]
+        np.testing.assert_allclose(A @ x[0], b, atol=1e-5)
+        assert x[0].min() > -1e-6
+        assert abs(c @ x[0] - reference_lp(A, b, c)) < 1e-5
+
+
+def test_interior_point_batches_independently():
+    rng = np.random.default_rng(1)
+    A = rng.normal(size=(5, 3, 7))
+    b = np.einsum("nij,nj->ni", A, rng.uniform(0.1, 1.0, (5, 7)))
+    c = rng.uniform(0.1, 1.0, 7)
+    x, converged = _interior_point(A, b, c)
+    for k in range(5):
+        xk, ck = _interior_point(A[k:k + 1], b[k:k + 1], c)
+        assert converged[k] and ck[0]
+        assert abs(c @ x[k] - c @ xk[0]) < 1e-5
+
+
+def test_margin_matches_reference_lp():
+    rng = np.random.default_rng(2)
+    contacts = np.stack([rng.uniform([-1, -0.05, -1], [1, 0.05, 1], (3, 3)) for _ in range(4)])
+    normals = stability.hold_normals(np.array([(0,), (1,), (2,)], dtype=[("side", "i1")]))
+    com = np.column_stack([rng.uniform(-0.3, 0.3, 4), rng.uniform(0.2, 0.8, 4), rng.uniform(-0.3, 0.3, 4)])
+    for max_force in (2.0, 4.0):
+        margin = stability_margin(contacts, normals, com, max_force=max_force)
+        for k in range(len(contacts)):
+            reference = reference_margin(contacts[k], normals, com[k], max_force)
+            if np.isinf(reference):
+                assert margin[k] < 1e-6
+            else:
+                assert abs(margin[k] - reference) < 1e-4
+
+
+def test_square_of_jugs_is_stable():
+    contacts, normals, com = square_stance()
+    assert stability_margin(contacts[None], normals, com[None])[0] > 0
+
+
+def test_contacts_on_one_line_are_unstable():
+    # No force on the holds turns the body about their line
+    contacts, normals, com = square_stance()
+    contacts[:, 2] = 0.0
+    assert stability_margin(contacts[None], normals, com[None])[0] < 0
+
+
+def test_undercut_holds_are_unstable():
+    # Holds that only push down leave nothing but wall friction to carry the weight
+    contacts, normals, com = square_stance()
+    assert stability_margin(contacts[None], -normals, com[None])[0] < 0
+
+
+def test_margin_grows_with_max_force():
+    contacts, normals, com = square_stance(com_offset=(0.0, 1.2, 0.0))
+    margins = [stability_margin(contacts[None], normals, com[None], max_force=f)[0] for f in (1.5, 2.0, 4.0)]
+    assert np.all(np.diff(margins) > 0)
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import taiwanbear_kinematics as tk
+from trajectory import MAGIC, _HEADER, interpolate, read_frames, write_trajectory
+
+
+def waypoints(n = 3, seed = 0):
+    rng = np.random.default_rng(seed)
+    result = []
+    for _ in range(n):
+        A = np.eye(4)
+        A[:3, 3] = rng.uniform(-1, 1, 3)
+        result.append((tk.HOME + rng.uniform(-0.5, 0.5, tk.DOF), A))
+    return result
+
+
+def test_interpolate_respects_speed_limits():
+    points = waypoints()
+    batches = list(interpolate(points, fps=30.0, max_velocity=1.0, max_base_velocity=0.5, batch=16))
+    assert all(len(Q) <= 16 for Q, _ in batches)
+    Q = np.concatenate([Q for Q, _ in batches])
+    A = np.concatenate([A for _, A in batches])
+    np.testing.assert_allclose(Q[0], points[0][0])
+    np.testing.assert_allclose(Q[-1], points[-1][0])
+    np.testing.assert_allclose(A[-1], points[-1][1])
+    for q, _ in points:
+        assert np.any(np.all(np.isclose(Q, q), axis=1))
+    assert np.abs(np.diff(Q, axis=0)).max() * 30.0 <= 1.0 + 1e-9
+    assert np.linalg.norm(np.diff(A[:, :3, 3], axis=0), axis=1).max() * 30.0 <= 0.5 + 1e-9
+
+
+def test_interpolate_rejects_rotating_base():
+    (q0, A0), (q1, A1) = waypoints(2)
+    A1[:3, :3] = [[0, -1, 0], [1, 0, 0], [0, 0, 1]]
+    with pytest.raises(ValueError):
+        list(interpolate([(q0, A0), (q1, A1)]))
+
+
+def test_frame_file_round_trip(tmp_path):
+    points = waypoints()
+    links = tk.EFFECTORS + ["TaiwanBear"]
+    path = str(tmp_path / "climb.frames")
+    count = write_trajectory(path, points, links=links, fps=24.0, batch=8)
+    assert count == sum(len(Q) for Q, _ in interpolate(points, fps=24.0))
+
+    names, fps, T = read_frames(path)
+    assert names == links and fps == 24.0 and T.shape == (count, len(links), 4, 4)
+    Q, A = next(interpolate(points, fps=24.0, batch=1))
+    expected = tk.forward_kinematics_batch(Q, A)[0, [tk.LINK_INDEX[name] for name in links]]
+    np.testing.assert_allclose(T[0], expected, atol=1e-5)
+
+    # Column-major float32 matrices like Matrix4.elements: translation at 12-14
+    with open(path, "rb") as f:
+        magic, n_links, frames, _, size = _HEADER.unpack(f.read(_HEADER.size))
+        f.seek(size, 1)
+        elements = np.frombuffer(f.read(64), dtype="<f4")
+    assert (magic, n_links, frames) == (MAGIC, len(links), count)
+    np.testing.assert_allclose(elements[12:15], expected[0, :3, 3], atol=1e-5)